@@ -1,4 +1,6 @@
-from pydantic_settings import BaseSettings
+from functools import lru_cache
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
@@ -6,21 +8,41 @@ class Settings(BaseSettings):
     gemini_model: str = "gemini-1.5-flash"
     gemini_temperature: float = 0.7
     gemini_max_tokens: int = 2048
+    gemini_max_concurrency: int = 8
+    gemini_batch_timeout: int = 3600
+    gemini_batch_interactive_timeout: int = 120
+    gemini_compress_requests: bool = True
+    gemini_context_cache_enabled: bool = True
+    gemini_context_cache_ttl: int = 3600
+    gemini_context_cache_min_tokens: int = 1024
     
     vector_db_path: str = "./data/vector_store"
     chunk_size: int = 1000
     chunk_overlap: int = 200
     embedding_model: str = "all-MiniLM-L6-v2"
+    embedding_batch_size: int = 32
+    hnsw_m: int = 24
+    hnsw_construction_ef: int = 128
+    hnsw_search_ef: int = 100
+    search_cache_enabled: bool = True
+    search_cache_threshold: float = 0.98
     
     app_name: str = "FenmoAI Offer Letter Generator"
     debug: bool = True
     log_level: str = "INFO"
     
     assets_path: str = "./assets"
+    cache_dir: str = "./data/cache"
+    offer_cache_enabled: bool = True
+    offer_cache_ttl: int = 86400
     
-    class Config:
-        env_file = ".env"
-        case_sensitive = False
+    model_config = SettingsConfigDict(env_file=".env", case_sensitive=False, frozen=True)
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the process-wide settings, parsing the environment only once"""
+    return Settings()
 
 
-settings = Settings()
\ No newline at end of file
+settings = get_settings()
\ No newline at end of file
@@ -1,21 +1,28 @@
-
-
+import importlib
 
 __version__ = "1.0.0"
 __author__ = "FenmoAI Team"
 
-# Core imports
-from .document_processor import PDFParser, IntelligentTextChunker
-from .data import EmployeeManager
-from .agent import GeminiClient, RAGEngine
-from .embeddings import EmbeddingManager, VectorStore
+# Core imports are resolved on first access: importing a submodule runs this file,
+# and loading chromadb, sentence-transformers and torch here would make every
+# `src.*` import (including PDF parsing worker processes) pay for the whole stack
+_EXPORTS = {
+    "PDFParser": ".document_processor",
+    "IntelligentTextChunker": ".document_processor",
+    "EmployeeManager": ".data",
+    "GeminiClient": ".agent",
+    "RAGEngine": ".agent",
+    "EmbeddingManager": ".embeddings",
+    "VectorStore": ".embeddings",
+}
+
+__all__ = list(_EXPORTS)
+
 
-__all__ = [
-    "PDFParser",
-    "IntelligentTextChunker", 
-    "EmployeeManager",
-    "GeminiClient",
-    "RAGEngine",
-    "EmbeddingManager",
-    "VectorStore"
-] 
\ No newline at end of file
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -3,10 +3,15 @@ AI Agent module for Gemini integration and offer letter generation.
 """
 
 from .gemini_client import GeminiClient, GenerationConfig
-from .rag_engine import RAGEngine
+from .rag_engine import RAGEngine, OfferLetterStream
+from .response_cache import OfferLetterCache
+from .schemas import EmployeeContext
 
 __all__ = [
     "GeminiClient",
     "GenerationConfig",
-    "RAGEngine"
+    "RAGEngine",
+    "OfferLetterStream",
+    "OfferLetterCache",
+    "EmployeeContext"
 ]
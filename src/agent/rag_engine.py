@@ -1,13 +1,59 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Callable
+import io
 import logging
+import asyncio
+import json
+import re
 from pathlib import Path
 
-from src.document_processor import PDFParser, IntelligentTextChunker
-from src.embeddings import EmbeddingManager, VectorStore
+from src.document_processor import PDFParser, IntelligentTextChunker, ParsedDocument
+from src.embeddings import EmbeddingManager, VectorStore, RelevantPolicies, MIN_COSINE_SIMILARITY
 from src.data import EmployeeManager
+from src.utils.response_formatter import ResponseFormatter
+from src.utils.json_utils import dumps_bytes
 from .gemini_client import GeminiClient
 from config import settings
 
+# Policy chunks injected into a single offer letter prompt, after de-duplication
+POLICY_TOP_K = 8
+
+# Chunks written to the vector store per add_chunks call during ingestion
+INGEST_BATCH_SIZE = 128
+
+# Rendered policy contexts kept per (band, retrieved chunks) signature
+POLICY_CONTEXT_CACHE_SIZE = 128
+
+_BAND_RE = re.compile(r'L[1-5]', re.IGNORECASE)
+_SENIOR_KEYWORDS = ('senior', 'executive', 'lead')
+_SENIOR_CONTENT_TERMS = ('L3', 'L4', 'L5', 'SENIOR', 'EXECUTIVE')
+_BAND_PATTERNS = ("{0} employees", "{0} band", "{0}:", "for {0}", "{0} level", "{0} staff")
+
+class OfferLetterStream:
+    """
+    Offer letter text fragments as Gemini produces them
+    
+    The employee context is available immediately; the full result dict, in the
+    same shape as RAGEngine.generate_offer_letter returns, is set once the stream
+    has been consumed.
+    """
+    
+    def __init__(self, 
+                 fragments: Iterator[str],
+                 offer_inputs: Dict[str, Any],
+                 finalize: Callable[[str], Dict[str, Any]]):
+        self._fragments = fragments
+        self._finalize = finalize
+        self.employee_context = offer_inputs['employee_context']
+        self.result: Optional[Dict[str, Any]] = None
+    
+    def __iter__(self) -> Iterator[str]:
+        buffer = io.StringIO()
+        for fragment in self._fragments:
+            buffer.write(fragment)
+            yield fragment
+        
+        self.result = self._finalize(buffer.getvalue().strip())
+
 class RAGEngine:
     
     def __init__(self, 
@@ -21,6 +67,11 @@ class RAGEngine:
         self.vector_store = vector_store or VectorStore()
         self.employee_manager = employee_manager or EmployeeManager(vector_store=self.vector_store)
         self.gemini_client = gemini_client or GeminiClient()
+        self.response_formatter = ResponseFormatter()
+        self._policy_context_cache: Dict[tuple, str] = {}
+        
+        self._template_context_cache: Optional[str] = None
+        self._template_cache_file = Path(settings.cache_dir) / "template_context.json"
         
         self.logger.info("RAG Engine initialized successfully")
     
@@ -41,44 +92,27 @@ class RAGEngine:
         }
         
         try:
-            all_chunks = []
+            # Chunks are flushed to the vector store in fixed-size batches as documents
+            # are chunked, so memory stays bounded and earlier batches survive a later failure
+            pending_chunks = []
             
-            for doc_path in document_paths:
-                doc_path = Path(doc_path)
-                if not doc_path.exists():
-                    error_msg = f"Document not found: {doc_path}"
-                    self.logger.error(error_msg)
+            for chunks, summary_entry, error_msg in self._parse_and_chunk_documents(document_paths):
+                if error_msg:
                     processing_summary['errors'].append(error_msg)
                     continue
                 
-                try:
-                    self.logger.info(f"Processing document: {doc_path.name}")
-                    
-                    parsed_doc = self.pdf_parser.parse_pdf(str(doc_path))
-                    
-                    chunks = self.text_chunker.chunk_document(parsed_doc)
-                    
-                    all_chunks.extend(chunks)
-                    
-                    processing_summary['processed_documents'].append({
-                        'filename': doc_path.name,
-                        'chunks_count': len(chunks),
-                        'document_type': parsed_doc.metadata.document_type,
-                        'pages': parsed_doc.metadata.page_count
-                    })
-                    
-                    self.logger.info(f"Generated {len(chunks)} chunks from {doc_path.name}")
-                    
-                except Exception as e:
-                    error_msg = f"Error processing {doc_path.name}: {str(e)}"
-                    self.logger.error(error_msg)
-                    processing_summary['errors'].append(error_msg)
-                    continue
+                pending_chunks.extend(chunks)
+                processing_summary['processed_documents'].append(summary_entry)
+                
+                while len(pending_chunks) >= INGEST_BATCH_SIZE:
+                    processing_summary['total_chunks'] += self._store_chunks(pending_chunks[:INGEST_BATCH_SIZE])
+                    del pending_chunks[:INGEST_BATCH_SIZE]
+            
+            if pending_chunks:
+                processing_summary['total_chunks'] += self._store_chunks(pending_chunks)
             
-            if all_chunks:
-                chunks_added = self.vector_store.add_chunks(all_chunks)
-                processing_summary['total_chunks'] = chunks_added
-                self.logger.info(f"Successfully stored {chunks_added} chunks in vector database")
+            if processing_summary['total_chunks']:
+                self.logger.info(f"Successfully stored {processing_summary['total_chunks']} chunks in vector database")
             else:
                 self.logger.warning("No chunks to store in vector database")
             
@@ -89,32 +123,96 @@ class RAGEngine:
             processing_summary['errors'].append(str(e))
             return processing_summary
     
-    def generate_offer_letter(self, employee_name: str) -> Dict[str, Any]:
+    def _store_chunks(self, chunks: List[Any]) -> int:
+        """Add one batch of chunks to the vector store and drop caches derived from it"""
         
-        try:
-            self.logger.info(f"Generating offer letter for: {employee_name}")
-            
-            employee_context = self.employee_manager.get_employee_context(employee_name)
-            self.logger.info(f"Retrieved employee context for {employee_name}")
+        chunks_added = self.vector_store.add_chunks(chunks)
+        self._invalidate_template_context()
+        return chunks_added
+    
+    def _parse_and_chunk_documents(self, document_paths: List[str]) -> Iterator[Tuple[List[Any], Optional[Dict[str, Any]], Optional[str]]]:
+        """
+        Parse and chunk documents, yielding (chunks, summary entry, error message) per document
+        
+        Parsing goes through PDFParser.parse_multiple_pdfs, which only starts worker
+        processes for large batches; the three bundled policy PDFs parse faster
+        serially than a spawned worker takes to start. Chunking is cheap and runs
+        here, one document at a time as the caller consumes results. Results keep
+        input order so chunk order stays deterministic.
+        """
+        
+        doc_paths = [Path(doc_path) for doc_path in document_paths]
+        
+        outcomes: List[Tuple[Optional[ParsedDocument], Optional[str]]] = [None] * len(doc_paths)
+        pending = []
+        for index, doc_path in enumerate(doc_paths):
+            if doc_path.exists():
+                pending.append(index)
+            else:
+                error_msg = f"Document not found: {doc_path}"
+                self.logger.error(error_msg)
+                outcomes[index] = (None, error_msg)
+        
+        for index, outcome in zip(pending, self._parse_documents([doc_paths[index] for index in pending])):
+            outcomes[index] = outcome
+        
+        for doc_path, (parsed_doc, error_msg) in zip(doc_paths, outcomes):
+            if error_msg:
+                yield [], None, error_msg
+                continue
             
-
-            employee_band = employee_context['employee'].get('salary_band', 'L1')
-            self._current_employee_band = employee_band
+            try:
+                chunks = self.text_chunker.chunk_document(parsed_doc)
+                
+                self.logger.info(f"Generated {len(chunks)} chunks from {doc_path.name}")
+                
+                summary_entry = {
+                    'filename': doc_path.name,
+                    'chunks_count': len(chunks),
+                    'document_type': parsed_doc.metadata.document_type,
+                    'pages': parsed_doc.metadata.page_count
+                }
+                
+            except Exception as e:
+                error_msg = f"Error processing {doc_path.name}: {str(e)}"
+                self.logger.error(error_msg)
+                yield [], None, error_msg
+                continue
             
-            relevant_policies = self.vector_store.get_relevant_policies(employee_context)
+            yield chunks, summary_entry, None
+    
+    def _parse_documents(self, doc_paths: List[Path]) -> List[Tuple[Optional[ParsedDocument], Optional[str]]]:
+        """Parse PDFs through the shared parser, keeping an error message for each failure"""
+        
+        for doc_path in doc_paths:
+            self.logger.info(f"Processing document: {doc_path.name}")
+        
+        return self.pdf_parser.parse_multiple_pdfs([str(doc_path) for doc_path in doc_paths], with_errors=True)
+    
+    def generate_offer_letter(self, 
+                              employee_name: str, 
+                              no_cache: bool = False,
+                              service_tier: str = "priority") -> Dict[str, Any]:
+        
+        try:
+            self.logger.info(f"Generating offer letter for: {employee_name}")
             
-            policy_context = self._build_policy_context(relevant_policies)
+            offer_inputs = self._prepare_offer_inputs(employee_name)
             
-            template_context = self._get_template_context()
+            cached_letter = None if no_cache else self._get_cached_letter(offer_inputs)
+            if cached_letter:
+                self.logger.info(f"Serving cached offer letter for {employee_name}")
+                return self._build_offer_result(employee_name, offer_inputs, cached_letter, cache_hit=True)
             
-
-            self.logger.info(f"About to call Gemini API for {employee_name} - policies: {len(relevant_policies)}, template: {bool(template_context)}")
+            self.logger.info(f"About to call Gemini API for {employee_name} - policies: {len(offer_inputs['relevant_policies'])}, template: {bool(offer_inputs['template_context'])}")
             
             try:
                 offer_letter_content = self.gemini_client.generate_offer_letter(
-                    employee_context=employee_context,
-                    policy_context=policy_context,
-                    template_context=template_context
+                    employee_context=offer_inputs['employee_context'],
+                    policy_context=offer_inputs['policy_context'],
+                    template_context=offer_inputs['template_context'],
+                    no_cache=no_cache,
+                    service_tier=service_tier
                 )
                 self.logger.info(f"Gemini API call completed for {employee_name}")
                 
@@ -122,38 +220,252 @@ class RAGEngine:
                 self.logger.error(f"Gemini API call failed for {employee_name}: {str(gemini_error)}")
                 raise gemini_error
             
-            result = {
-                'employee_name': employee_name,
-                'offer_letter': offer_letter_content,
-                'employee_context': employee_context,
-                'relevant_policies': relevant_policies,
-                'generation_metadata': {
-                    'policies_used': len(relevant_policies),
-                    'total_policy_chunks': sum(len(policies) for policies in relevant_policies.values()),
-                    'template_used': bool(template_context),
-                    'enhanced_formatting': True  
-                }
-            }
-            
-            if hasattr(self, '_current_employee_band'):
-                delattr(self, '_current_employee_band')
-            
             self.logger.info(f"Successfully generated offer letter for {employee_name}")
-            return result
+            return self._build_offer_result(employee_name, offer_inputs, offer_letter_content)
             
         except Exception as e:
             self.logger.error(f"Error generating offer letter for {employee_name}: {str(e)}")
             raise
     
-    def _build_policy_context(self, relevant_policies: Dict[str, List[Dict]]) -> str:
+    def generate_offer_letter_bytes(self, 
+                                    employee_name: str, 
+                                    no_cache: bool = False,
+                                    service_tier: str = "priority") -> bytes:
+        """
+        generate_offer_letter serialized to JSON bytes, ready to hand to an HTTP response
+        
+        Internal search fields (underscore-prefixed keys on policy chunks) are left out.
+        """
+        
+        result = self.generate_offer_letter(employee_name, no_cache=no_cache, service_tier=service_tier)
+        
+        payload = dict(result)
+        payload['relevant_policies'] = {
+            policy_type: [
+                {key: value for key, value in policy.items() if not key.startswith('_')}
+                for policy in policies
+            ]
+            for policy_type, policies in result['relevant_policies'].items()
+        }
+        
+        return dumps_bytes(payload)
+    
+    async def agenerate_offer_letter(self, 
+                                     employee_name: str, 
+                                     no_cache: bool = False,
+                                     service_tier: str = "priority") -> Dict[str, Any]:
+        """Async variant of generate_offer_letter; only the Gemini call is awaited"""
+        
+        offer_inputs = self._prepare_offer_inputs(employee_name)
+        
+        cached_letter = None if no_cache else self._get_cached_letter(offer_inputs)
+        if cached_letter:
+            return self._build_offer_result(employee_name, offer_inputs, cached_letter, cache_hit=True)
+        
+        offer_letter_content = await self.gemini_client.agenerate_offer_letter(
+            employee_context=offer_inputs['employee_context'],
+            policy_context=offer_inputs['policy_context'],
+            template_context=offer_inputs['template_context'],
+            no_cache=no_cache,
+            service_tier=service_tier
+        )
+        
+        return self._build_offer_result(employee_name, offer_inputs, offer_letter_content)
+    
+    def generate_offer_letter_stream(self, employee_name: str, no_cache: bool = False) -> OfferLetterStream:
+        """
+        Stream an offer letter for an employee as it is generated
+        
+        Retrieval runs before this returns, so unknown employees fail immediately;
+        Gemini is only called once the returned stream is iterated.
+        """
+        
+        self.logger.info(f"Streaming offer letter for: {employee_name}")
+        
+        offer_inputs = self._prepare_offer_inputs(employee_name)
+        
+        cached_letter = None if no_cache else self._get_cached_letter(offer_inputs)
+        if cached_letter:
+            self.logger.info(f"Serving cached offer letter for {employee_name}")
+            return OfferLetterStream(
+                iter([cached_letter]),
+                offer_inputs,
+                lambda letter: self._build_offer_result(employee_name, offer_inputs, letter, cache_hit=True)
+            )
+        
+        fragments = self.gemini_client.generate_offer_letter_stream(
+            employee_context=offer_inputs['employee_context'],
+            policy_context=offer_inputs['policy_context'],
+            template_context=offer_inputs['template_context'],
+            no_cache=no_cache
+        )
+        
+        return OfferLetterStream(
+            fragments,
+            offer_inputs,
+            lambda letter: self._build_offer_result(employee_name, offer_inputs, letter)
+        )
+    
+    def _get_cached_letter(self, offer_inputs: Dict[str, Any]) -> Optional[str]:
+        """Look up a cached offer letter generated from exactly these prepared inputs"""
+        
+        return self.gemini_client.get_cached_offer_letter(
+            employee_context=offer_inputs['employee_context'],
+            policy_context=offer_inputs['policy_context'],
+            template_context=offer_inputs['template_context']
+        )
+    
+    def _prepare_offer_inputs(self, 
+                              employee_name: str, 
+                              template_context: str = None,
+                              band_policies: Dict[str, RelevantPolicies] = None) -> Dict[str, Any]:
+        """
+        Gather employee context, policies and template for one offer letter
+        
+        Policy retrieval depends only on the salary band, so callers preparing many
+        letters can pass a shared band_policies dict to retrieve once per band.
+        """
+        
+        employee_context = self.employee_manager.get_employee_context(employee_name)
+        self.logger.info(f"Retrieved employee context for {employee_name}")
+        
+        employee_band = employee_context['employee'].get('salary_band', 'L1')
+        
+        if band_policies is None:
+            relevant_policies = self._select_top_policies(
+                self.vector_store.get_relevant_policies(employee_context)
+            )
+        else:
+            relevant_policies = band_policies.get(employee_band)
+            if relevant_policies is None:
+                relevant_policies = self._select_top_policies(
+                    self.vector_store.get_relevant_policies(employee_context)
+                )
+                band_policies[employee_band] = relevant_policies
+        
+        policy_context = self._build_policy_context(relevant_policies, employee_band)
+        
+        if template_context is None:
+            template_context = self._get_template_context()
+        
+        return {
+            'employee_context': employee_context,
+            'relevant_policies': relevant_policies,
+            'policy_context': policy_context,
+            'template_context': template_context
+        }
+    
+    def _prefetch_band_policies(self, employee_names: List[str]) -> Dict[str, RelevantPolicies]:
+        """Retrieve policies for every salary band in a batch with a single vector store query"""
+        
+        band_contexts = {}
+        for employee_name in employee_names:
+            employee = self.employee_manager.find_employee(employee_name)
+            if employee and employee.salary_band not in band_contexts:
+                band_contexts[employee.salary_band] = self.employee_manager.get_employee_context(employee_name)
+        
+        if not band_contexts:
+            return {}
+        
+        policies = self.vector_store.get_relevant_policies_batch(list(band_contexts.values()))
+        
+        return {
+            band: self._select_top_policies(relevant_policies)
+            for band, relevant_policies in zip(band_contexts, policies)
+        }
+    
+    def _build_offer_result(self, 
+                            employee_name: str, 
+                            offer_inputs: Dict[str, Any], 
+                            offer_letter_content: str,
+                            cache_hit: bool = False) -> Dict[str, Any]:
+        """Assemble the result dict returned for a generated offer letter"""
+        
+        relevant_policies = offer_inputs['relevant_policies']
+        
+        return {
+            'employee_name': employee_name,
+            'offer_letter': offer_letter_content,
+            'employee_context': offer_inputs['employee_context'],
+            'relevant_policies': relevant_policies,
+            'generation_metadata': {
+                'policies_used': len(relevant_policies),
+                'total_policy_chunks': relevant_policies.total_chunks,
+                'template_used': bool(offer_inputs['template_context']),
+                'enhanced_formatting': True,
+                'cache_hit': cache_hit
+            }
+        }
+    
+    def _select_top_policies(self, 
+                             relevant_policies: Dict[str, List[Dict]],
+                             top_k: int = POLICY_TOP_K) -> RelevantPolicies:
+        """
+        Keep only the top_k most similar distinct policy chunks
+        
+        The per-policy-type searches overlap heavily, so the same chunk is often
+        returned under several types. Each chunk is kept once, under the type where
+        it scored highest, and the grouping and order by type are preserved.
+        """
+        
+        ranked = sorted(
+            (
+                (policy.get('similarity', 0.0), policy_type, position, policy)
+                for policy_type, policies in relevant_policies.items()
+                for position, policy in enumerate(policies)
+            ),
+            key=lambda item: item[0],
+            reverse=True
+        )
+        
+        selected = set()
+        seen_content = set()
+        for _, policy_type, position, policy in ranked:
+            if len(selected) >= top_k:
+                break
+            if policy['content'] in seen_content:
+                continue
+            seen_content.add(policy['content'])
+            selected.add((policy_type, position))
+        
+        top_policies = {}
+        for policy_type, policies in relevant_policies.items():
+            kept = [policy for position, policy in enumerate(policies) if (policy_type, position) in selected]
+            if kept:
+                top_policies[policy_type] = kept
+        
+        return RelevantPolicies(top_policies)
+    
+    def _build_policy_context(self, 
+                              relevant_policies: Dict[str, List[Dict]],
+                              employee_band: Optional[str] = None) -> str:
         
         if not relevant_policies:
             return "No specific policies found."
         
+        # Employees in the same band retrieve the same chunks, so a batch mostly
+        # rebuilds identical contexts; key on band plus what the output depends on
+        signature = (employee_band, tuple(
+            (policy_type, tuple((policy['_content_key'], f"{policy.get('similarity', 0.0):.2f}") for policy in policies))
+            for policy_type, policies in relevant_policies.items()
+        ))
+        
+        policy_context = self._policy_context_cache.get(signature)
+        if policy_context is None:
+            policy_context = self._render_policy_context(relevant_policies, employee_band)
+            if len(self._policy_context_cache) >= POLICY_CONTEXT_CACHE_SIZE:
+                self._policy_context_cache.pop(next(iter(self._policy_context_cache)))
+            self._policy_context_cache[signature] = policy_context
+        
+        return policy_context
+    
+    def _render_policy_context(self, 
+                               relevant_policies: Dict[str, List[Dict]],
+                               employee_band: Optional[str] = None) -> str:
+        
         context_parts = []
         
-        from src.utils.response_formatter import ResponseFormatter
-        formatter = ResponseFormatter()
+        formatter = self.response_formatter
         
         for policy_type, policies in relevant_policies.items():
             if policies:
@@ -164,7 +476,6 @@ class RAGEngine:
                     content = policy['content']
                     
                     if policy_type == 'travel_policy' and formatter._is_travel_matrix(content):
-                        employee_band = self._extract_employee_band_from_context()
                         if employee_band:
                             enhanced_travel_info = formatter._parse_travel_entitlement_matrix(content, employee_band)
                             if enhanced_travel_info and 'Travel Policy Breakdown:' in enhanced_travel_info:
@@ -173,7 +484,6 @@ class RAGEngine:
                                 continue
                     
                     elif policy_type == 'leave_policy' and formatter._is_leave_matrix(content):
-                        employee_band = self._extract_employee_band_from_context()
                         if employee_band:
                             enhanced_leave_info = formatter._parse_leave_entitlement_matrix(content, employee_band)
                             if enhanced_leave_info and 'Leave Days Allocation:' in enhanced_leave_info:
@@ -182,24 +492,34 @@ class RAGEngine:
                                 continue
                     
                     context_parts.append(
-                        f"\n{i}. (Relevance: {similarity_score:.2f})\n{content[:500]}..."
+                        f"\n{i}. (Relevance: {similarity_score:.2f})\n{policy['_content_preview']}..."
                     )
         
         return "\n".join(context_parts)
     
-    def _extract_employee_band_from_context(self) -> str:
-        """Extract employee band from current context during offer letter generation"""
+    def _get_template_context(self) -> str:
+        """Template context, retrieved once and reused until the vector store changes"""
+        
+        if self._template_context_cache is not None:
+            return self._template_context_cache
         
-        return getattr(self, '_current_employee_band', None)
+        signature = f"{self.vector_store.collection_name}:{self.vector_store.collection.count()}"
+        template_context = self._load_template_context(signature)
+        
+        if template_context is None:
+            template_context = self._fetch_template_context(signature)
+        
+        self._template_context_cache = template_context
+        return template_context
     
-    def _get_template_context(self) -> str:
+    def _fetch_template_context(self, signature: str) -> str:
         
         try:
             template_results = self.vector_store.similarity_search(
                 query="offer letter employment agreement position salary compensation",
                 n_results=2,
                 document_types=['offer_template'],
-                    min_similarity=0.0
+                    min_similarity=MIN_COSINE_SIMILARITY
             )
             
             if template_results:
@@ -207,7 +527,9 @@ class RAGEngine:
                 for result in template_results:
                     template_content.append(result['content'])
                 
-                return "\n\n".join(template_content)
+                template_context = "\n\n".join(template_content)
+                self._save_template_context(signature, template_context)
+                return template_context
             else:
                 self.logger.warning("No template found, using default structure")
                 return self._get_default_template_structure()
@@ -216,6 +538,39 @@ class RAGEngine:
             self.logger.warning(f"Could not retrieve template context: {str(e)}")
             return self._get_default_template_structure()
     
+    def _load_template_context(self, signature: str) -> Optional[str]:
+        """Load the template context persisted for the current collection, if any"""
+        
+        try:
+            if self._template_cache_file.exists():
+                with open(self._template_cache_file, 'r', encoding='utf-8') as f:
+                    cached = json.load(f)
+                if cached.get('signature') == signature:
+                    return cached['template_context']
+        except Exception as e:
+            self.logger.warning(f"Could not load cached template context: {str(e)}")
+        
+        return None
+    
+    def _save_template_context(self, signature: str, template_context: str):
+        """Persist the retrieved template context so cold starts skip the vector search"""
+        
+        try:
+            self._template_cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self._template_cache_file, 'w', encoding='utf-8') as f:
+                json.dump({'signature': signature, 'template_context': template_context}, f)
+        except Exception as e:
+            self.logger.warning(f"Could not save template context: {str(e)}")
+    
+    def _invalidate_template_context(self):
+        """Forget the template context after the document collection changes"""
+        
+        self._template_context_cache = None
+        try:
+            self._template_cache_file.unlink(missing_ok=True)
+        except Exception as e:
+            self.logger.warning(f"Could not remove cached template context: {str(e)}")
+    
     def _get_default_template_structure(self) -> str:
         
         return """
@@ -242,13 +597,11 @@ class RAGEngine:
     def search_policies(self, query: str, document_types: List[str] = None) -> List[Dict[str, Any]]:
         
         try:
-            import re
             query_lower = query.lower()
             
-            band_matches = re.findall(r'L[1-5]', query.upper())
-            unique_bands = list(dict.fromkeys(band_matches))
+            unique_bands = list(dict.fromkeys(band.upper() for band in _BAND_RE.findall(query)))
             
-            is_senior_query = any(term in query_lower for term in ['senior', 'executive', 'lead'])
+            is_senior_query = any(term in query_lower for term in _SENIOR_KEYWORDS)
             
             if len(unique_bands) > 1:
                 return self._search_multiple_bands(query, unique_bands, document_types)
@@ -274,12 +627,12 @@ class RAGEngine:
             band_results = self._search_specific_band(query, band, document_types)
             
             for result in band_results:
-                content_key = result['content'][:100]
+                content_key = result['_content_key']
                 if content_key not in seen_content:
                     seen_content.add(content_key)
                     
                     result['relevant_bands'] = [band]
-                    if band in result['content'].upper():
+                    if band in result['_content_upper']:
                         result['band_specific'] = True
                         result['priority'] = 'high'
                     
@@ -292,20 +645,18 @@ class RAGEngine:
             query
         ]
         
-        for search_query in multi_band_queries:
-            results = self.vector_store.similarity_search(
-                query=search_query,
-                n_results=5,
-                document_types=document_types,
-                min_similarity=0.1
-            )
-            
+        for results in self.vector_store.similarity_search_batch(
+            queries=multi_band_queries,
+            n_results=5,
+            document_types=document_types,
+            min_similarity=MIN_COSINE_SIMILARITY
+        ):
             for result in results:
-                content_key = result['content'][:100]
+                content_key = result['_content_key']
                 if content_key not in seen_content:
                     seen_content.add(content_key)
                     
-                    mentioned_bands = [band for band in bands if band in result['content'].upper()]
+                    mentioned_bands = [band for band in bands if band in result['_content_upper']]
                     result['relevant_bands'] = mentioned_bands if mentioned_bands else bands
                     result['band_specific'] = len(mentioned_bands) > 0
                     result['priority'] = 'high' if len(mentioned_bands) > 1 else 'medium'
@@ -350,20 +701,18 @@ class RAGEngine:
         primary_results = []
         seen_content = set()
         
-        for search_query in primary_queries:
-            results = self.vector_store.band_specific_search(
-                query=search_query,
-                band=band,
-                n_results=8,
-                document_types=document_types,
-                min_similarity=0.1
-            )
-            
+        for results in self.vector_store.band_specific_search_batch(
+            queries=primary_queries,
+            band=band,
+            n_results=8,
+            document_types=document_types,
+            min_similarity=MIN_COSINE_SIMILARITY
+        ):
             for result in results:
-                content_key = result['content'][:100]
+                content_key = result['_content_key']
                 if content_key not in seen_content:
                     seen_content.add(content_key)
-                    if band in result['content'].upper():
+                    if band in result['_content_upper']:
                         result['similarity'] += 0.3
                         result['band_specific'] = True
                     else:
@@ -377,16 +726,14 @@ class RAGEngine:
         ]
         
         context_results = []
-        for search_query in context_queries:
-            results = self.vector_store.similarity_search(
-                query=search_query,
-                n_results=3,
-                document_types=document_types,
-                min_similarity=0.05
-            )
-            
+        for results in self.vector_store.similarity_search_batch(
+            queries=context_queries,
+            n_results=3,
+            document_types=document_types,
+            min_similarity=MIN_COSINE_SIMILARITY
+        ):
             for result in results:
-                content_key = result['content'][:100]
+                content_key = result['_content_key']
                 if content_key not in seen_content:
                     seen_content.add(content_key)
                     result['similarity'] = max(0.2, result['similarity'] - 0.2)
@@ -430,19 +777,17 @@ class RAGEngine:
         all_results = []
         seen_content = set()
         
-        for search_query in search_queries:
-            results = self.vector_store.similarity_search(
-                query=search_query,
-                n_results=5,
-                document_types=document_types,
-                min_similarity=0.05
-            )
-            
+        for results in self.vector_store.similarity_search_batch(
+            queries=search_queries,
+            n_results=5,
+            document_types=document_types,
+            min_similarity=MIN_COSINE_SIMILARITY
+        ):
             for result in results:
-                content_key = result['content'][:100]
+                content_key = result['_content_key']
                 if content_key not in seen_content:
                     seen_content.add(content_key)
-                    if any(term in result['content'].upper() for term in ['L3', 'L4', 'L5', 'SENIOR', 'EXECUTIVE']):
+                    if any(term in result['_content_upper'] for term in _SENIOR_CONTENT_TERMS):
                         result['similarity'] += 0.2
                     all_results.append(result)
         
@@ -472,16 +817,14 @@ class RAGEngine:
         all_results = []
         seen_content = set()
         
-        for search_query in search_queries:
-            results = self.vector_store.similarity_search(
-                query=search_query,
-                n_results=5,
-                document_types=document_types,
-                min_similarity=0.05
-            )
-            
+        for results in self.vector_store.similarity_search_batch(
+            queries=search_queries,
+            n_results=5,
+            document_types=document_types,
+            min_similarity=MIN_COSINE_SIMILARITY
+        ):
             for result in results:
-                content_key = result['content'][:100]
+                content_key = result['_content_key']
                 if content_key not in seen_content:
                     seen_content.add(content_key)
                     all_results.append(result)
@@ -496,7 +839,7 @@ class RAGEngine:
         general_content = []
         
         for result in results:
-            content = result['content'].upper()
+            content = result['_content_upper']
             
             if band in content:
                 if self._is_band_focused_content(result['content'], band):
@@ -518,23 +861,16 @@ class RAGEngine:
         content_lower = content.lower()
         band_lower = band.lower()
         
-        band_focus_patterns = [
-            f"{band_lower} employees",
-            f"{band_lower} band",
-            f"{band_lower}:",
-            f"for {band_lower}",
-            f"{band_lower} level",
-            f"{band_lower} staff"
-        ]
-        
-        return any(pattern in content_lower for pattern in band_focus_patterns)
+        return any(pattern.format(band_lower) in content_lower for pattern in _BAND_PATTERNS)
     
     def get_system_status(self) -> Dict[str, Any]:
         
         try:
+            # Only the collection scan does I/O (test_connection makes no request), so
+            # there is nothing for a worker thread to overlap it with
             vector_stats = self.vector_store.get_collection_stats()
             
-            employee_count = len(self.employee_manager.list_all_employees())
+            employee_count = self.employee_manager.count_employees()
             
             gemini_status = self.gemini_client.test_connection()
             
@@ -562,12 +898,46 @@ class RAGEngine:
         
         try:
             self.vector_store.clear_collection()
+            self._invalidate_template_context()
+            self.gemini_client.invalidate_context_caches()
+            self.gemini_client.clear_offer_cache()
             self.logger.info("Vector store reset successfully")
         except Exception as e:
             self.logger.error(f"Error resetting vector store: {str(e)}")
             raise
     
-    def batch_generate_offers(self, employee_names: List[str]) -> Dict[str, Any]:
+    def batch_generate_offers(self, 
+                              employee_names: List[str], 
+                              max_concurrency: int = None,
+                              tier: str = "standard",
+                              batch_timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Generate offer letters for several employees (not for use inside a running event loop)"""
+        
+        return asyncio.run(self.abatch_generate_offers(employee_names, max_concurrency, tier, batch_timeout))
+    
+    async def abatch_generate_offers(self, 
+                                     employee_names: List[str], 
+                                     max_concurrency: int = None,
+                                     tier: str = "standard",
+                                     batch_timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Generate offer letters for several employees with concurrent Gemini calls
+        
+        Retrieval runs up front, with the template context fetched once for the whole
+        batch and policies retrieved once per salary band; only the Gemini requests
+        run concurrently.
+        
+        Args:
+            employee_names: Employees to generate offer letters for
+            max_concurrency: Maximum number of in-flight Gemini requests
+            tier: "standard" for concurrent interactive requests, or "batch" to submit
+                everything as one discounted Gemini batch job with no latency guarantee
+            batch_timeout: Seconds to wait on a batch job before falling back to concurrent
+                requests; defaults to the interactive limit
+        """
+        
+        if tier not in ("standard", "batch"):
+            raise ValueError(f"Unknown generation tier: {tier}")
         
         results = {
             'successful': {},
@@ -579,15 +949,52 @@ class RAGEngine:
             }
         }
         
+        def record_failure(employee_name: str, error: Exception):
+            results['failed'][employee_name] = str(error)
+            results['summary']['failed'] += 1
+            self.logger.error(f"Failed to generate offer for {employee_name}: {str(error)}")
+        
+        template_context = self._get_template_context() if employee_names else None
+        band_policies = self._prefetch_band_policies(employee_names)
+        
+        prepared = []
         for employee_name in employee_names:
             try:
-                offer_result = self.generate_offer_letter(employee_name)
-                results['successful'][employee_name] = offer_result
-                results['summary']['successful'] += 1
-                
+                offer_inputs = self._prepare_offer_inputs(employee_name, template_context, band_policies)
             except Exception as e:
-                results['failed'][employee_name] = str(e)
-                results['summary']['failed'] += 1
-                self.logger.error(f"Failed to generate offer for {employee_name}: {str(e)}")
+                record_failure(employee_name, e)
+                continue
+            
+            cached_letter = self._get_cached_letter(offer_inputs)
+            if cached_letter:
+                results['successful'][employee_name] = self._build_offer_result(
+                    employee_name, offer_inputs, cached_letter, cache_hit=True
+                )
+                results['summary']['successful'] += 1
+                continue
+            
+            prepared.append((employee_name, offer_inputs))
         
-        return results 
\ No newline at end of file
+        letters = await self.gemini_client.agenerate_offer_letters_batch(
+            [
+                {
+                    'employee_context': offer_inputs['employee_context'],
+                    'policy_context': offer_inputs['policy_context'],
+                    'template_context': offer_inputs['template_context']
+                }
+                for _, offer_inputs in prepared
+            ],
+            max_concurrency=max_concurrency,
+            use_batch_api=tier == "batch",
+            batch_timeout=batch_timeout
+        )
+        
+        for (employee_name, offer_inputs), letter in zip(prepared, letters):
+            if isinstance(letter, Exception):
+                record_failure(employee_name, letter)
+                continue
+            
+            results['successful'][employee_name] = self._build_offer_result(employee_name, offer_inputs, letter)
+            results['summary']['successful'] += 1
+        
+        return results
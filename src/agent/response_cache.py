@@ -0,0 +1,126 @@
+import sqlite3
+import hashlib
+import json
+import time
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional
+from config import get_settings
+
+settings = get_settings()
+
+class OfferLetterCache:
+    """
+    Persistent cache for generated offer letters backed by SQLite
+    
+    Letters are looked up by an exact key over every generation input, including the
+    full policy context, so a letter is never reused after the policies it was built
+    from change.
+    """
+    
+    def __init__(self, db_path: str = None, ttl_seconds: int = None):
+        self.db_path = Path(db_path or f"{settings.cache_dir}/offer_letters.sqlite3")
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.offer_cache_ttl
+        self.logger = logging.getLogger(__name__)
+        self._setup_database()
+    
+    def _setup_database(self):
+        """Create the cache table if it does not exist"""
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS offer_letter_cache (
+                        key TEXT PRIMARY KEY,
+                        letter TEXT NOT NULL,
+                        created_at REAL NOT NULL
+                    )
+                    """
+                )
+                # Embedding-matched letters could be served for edited policies that share
+                # their opening text; drop the table earlier versions kept them in
+                conn.execute("DROP TABLE IF EXISTS offer_letter_semantic_cache")
+        except Exception as e:
+            self.logger.error(f"Failed to initialize offer letter cache: {str(e)}")
+            raise
+    
+    def _connect(self) -> sqlite3.Connection:
+        # A connection per operation keeps the cache safe to share across threads
+        return sqlite3.connect(str(self.db_path), timeout=10)
+    
+    @staticmethod
+    def make_key(employee_context: Dict,
+                 policy_context: str,
+                 template_context: str,
+                 generation_config: Any) -> str:
+        """
+        Build a cache key from everything that influences the generated letter
+        
+        Args:
+            employee_context: Employee details and benefits
+            policy_context: Relevant HR policies
+            template_context: Offer letter template structure
+            generation_config: Model generation parameters
+            
+        Returns:
+            Hex digest identifying the generation request
+        """
+        digest = hashlib.blake2b(digest_size=32)
+        digest.update(json.dumps(employee_context, sort_keys=True, default=str).encode('utf-8'))
+        digest.update(policy_context.encode('utf-8'))
+        digest.update(template_context.encode('utf-8'))
+        digest.update(f"{settings.gemini_model}|{generation_config!r}".encode('utf-8'))
+        return digest.hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached letter for a key, or None on a miss or expired entry"""
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT letter, created_at FROM offer_letter_cache WHERE key = ?",
+                    (key,)
+                ).fetchone()
+            
+            if not row:
+                return None
+            
+            letter, created_at = row
+            if self.ttl_seconds and time.time() - created_at > self.ttl_seconds:
+                self.delete(key)
+                return None
+            
+            return letter
+            
+        except Exception as e:
+            self.logger.warning(f"Offer letter cache lookup failed: {str(e)}")
+            return None
+    
+    def set(self, key: str, letter: str):
+        """Store a generated letter"""
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO offer_letter_cache (key, letter, created_at) VALUES (?, ?, ?)",
+                    (key, letter, time.time())
+                )
+        except Exception as e:
+            self.logger.warning(f"Could not store offer letter in cache: {str(e)}")
+    
+    def delete(self, key: str):
+        """Remove a single cached letter"""
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM offer_letter_cache WHERE key = ?", (key,))
+        except Exception as e:
+            self.logger.warning(f"Could not delete cached offer letter: {str(e)}")
+    
+    def clear(self):
+        """Remove all cached letters"""
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM offer_letter_cache")
+            self.logger.info("Offer letter cache cleared")
+        except Exception as e:
+            self.logger.error(f"Error clearing offer letter cache: {str(e)}")
+            raise
@@ -0,0 +1,49 @@
+from typing import Any, Dict, Optional
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+
+class EmployeeInfo(BaseModel):
+    """Employee fields the offer letter prompt depends on"""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
+    name: str
+    position: str
+    department: str
+    team: str
+    salary_band: str
+    base_salary: float
+    performance_bonus: float
+    retention_bonus: float
+    total_ctc: float
+    joining_date: str
+    employee_id: str
+
+
+class BandInfo(BaseModel):
+    """Salary band details; every field is optional since bands may be partially extracted"""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
+    level: Optional[str] = None
+    leave_days: Optional[Any] = None
+    travel_allowance: Optional[Any] = None
+
+
+class EmployeeContext(BaseModel):
+    """Shape of the employee_context dict passed to GeminiClient"""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
+    employee: EmployeeInfo
+    salary_band_info: BandInfo = BandInfo()
+
+
+def validate_employee_context(employee_context: Dict) -> EmployeeContext:
+    """
+    Validate an employee context before any prompt is built or request sent
+    
+    Raises:
+        ValueError: If required employee fields are missing or malformed
+    """
+    try:
+        return EmployeeContext.model_validate(employee_context)
+    except ValidationError as e:
+        raise ValueError(f"Invalid employee context: {e}") from e
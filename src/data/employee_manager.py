@@ -1,12 +1,102 @@
 import pandas as pd
-from typing import Dict, List, Optional
+import re
+import sys
+import functools
+from typing import Dict, List, Optional, Tuple, Pattern, FrozenSet
 from pathlib import Path
 from dataclasses import dataclass
+from collections import defaultdict
 import logging
 from config import settings
+from src.embeddings import MIN_COSINE_SIMILARITY
+
+LEAVE_DAY_PATTERN_TEMPLATES = (
+    r'Ban d:\s*{band}\s*\|\s*Total Leave Days:\s*(\d+)',
+    r'ROW\s+\d+\s+DETAILS:.*?Ban d:\s*{band}\s*\|\s*Total Leave Days:\s*(\d+)',
+    r'{band}\s*\|\s*(\d+)\s*\|',
+    r'^\s*{band}\s+(\d+)\s+\d+\s+\d+',
+    r'^\s*{band}\s+(\d+)',
+    r'{band}[:\s]*(\d+)\s*days?',
+    r'(\d+)\s*days?[^0-9]*{band}'
+)
+
+TRAVEL_ROW_PATTERN_TEMPLATES = (
+    r'{band}.*?Economy.*?Rs\.?\s*(\d+)',  # "L1 ... Economy Rs. 2000"
+    r'{band}.*?Business.*?Rs\.?\s*(\d+)', # "L2 ... Business Rs. 3000"
+    r'{band}.*?(\w+)\s+Class',            # "L3 ... Premium Class"
+    r'{band}.*?(\w+)\s+Rs\.\s*\d+'        # "L4 Executive Rs. 5000"
+)
+
+# Travel allowance tiers in priority order, with the phrases that indicate each one
+ALLOWANCE_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    'standard': ('standard', 'basic', 'regular', 'economy', '2000'),
+    'enhanced': ('enhanced', 'improved', 'better', 'business', '3000'),
+    'premium': ('premium', 'senior', 'advanced', '4000'),
+    'executive': ('executive', 'lead', 'management', '5000'),
+    'executive plus': ('executive plus', 'top tier', 'highest', '6000')
+}
+
+# Zero-width lookahead so every keyword occurrence is found in one scan, even where
+# keywords overlap; alternatives are longest first, so a keyword also implies the
+# tiers of any shorter keyword it starts with
+_ALLOWANCE_KEYWORD_RE = re.compile(
+    '(?=(' + '|'.join(
+        re.escape(keyword)
+        for keyword in sorted({k for keywords in ALLOWANCE_KEYWORDS.values() for k in keywords}, key=len, reverse=True)
+    ) + '))'
+)
+_ALLOWANCE_KEYWORD_TIERS: Dict[str, FrozenSet[str]] = {
+    keyword: frozenset(
+        tier for tier, keywords in ALLOWANCE_KEYWORDS.items()
+        if any(keyword.startswith(other) for other in keywords)
+    )
+    for keywords in ALLOWANCE_KEYWORDS.values()
+    for keyword in keywords
+}
+
+# Policy eligibility depends only on the salary band; entries are shared, so treat them as read-only
+BAND_POLICIES: Dict[str, Dict[str, bool]] = {
+    band: {
+        'leave_policy': True,
+        'travel_policy': True,
+        'wfh_policy': band in {'L2', 'L3', 'L4', 'L5'},
+        'flexible_hours': band in {'L3', 'L4', 'L5'}
+    }
+    for band in ('L1', 'L2', 'L3', 'L4', 'L5')
+}
+
+DEFAULT_POLICIES: Dict[str, bool] = {
+    'leave_policy': True,
+    'travel_policy': True,
+    'wfh_policy': False,
+    'flexible_hours': False
+}
+
+@functools.lru_cache(maxsize=None)
+def _leave_day_patterns(band: str) -> Tuple[Pattern, ...]:
+    """Compiled leave-day patterns for a band, built once per band"""
+    return tuple(
+        re.compile(template.format(band=band), re.IGNORECASE | re.MULTILINE)
+        for template in LEAVE_DAY_PATTERN_TEMPLATES
+    )
+
+@functools.lru_cache(maxsize=None)
+def _travel_row_patterns(band: str) -> Tuple[Pattern, ...]:
+    """Compiled travel matrix row patterns for a band, built once per band"""
+    return tuple(
+        re.compile(template.format(band=band), re.IGNORECASE)
+        for template in TRAVEL_ROW_PATTERN_TEMPLATES
+    )
 
 @dataclass
 class Employee:
+    # Explicit slots: no per-instance __dict__ for what can be a large roster
+    __slots__ = (
+        'name', 'position', 'department', 'team', 'salary_band', 'base_salary',
+        'performance_bonus', 'retention_bonus', 'total_ctc', 'joining_date',
+        'employee_id', 'name_key'
+    )
+    
     name: str
     position: str
     department: str
@@ -18,6 +108,7 @@ class Employee:
     total_ctc: float
     joining_date: str
     employee_id: str
+    name_key: str  # casefolded name used for lookups
 
 class EmployeeManager:
     """
@@ -29,6 +120,8 @@ class EmployeeManager:
         self.vector_store = vector_store
         self.logger = logging.getLogger(__name__)
         self.employees: Dict[str, Employee] = {}
+        self._by_band: Dict[str, List[Employee]] = {}
+        self._all_names: List[str] = []
         self.salary_bands = {}
         self._load_employees()
         self._extract_salary_bands_from_policies()
@@ -38,22 +131,53 @@ class EmployeeManager:
         try:
             df = pd.read_csv(self.csv_path)
             
-            for _, row in df.iterrows():
+            def column(name: str, default) -> list:
+                """Whole column as plain Python values, avoiding per-row Series boxing"""
+                return df[name].tolist() if name in df.columns else [default] * len(df)
+            
+            names = [value.strip() for value in column('Employee Name', '')]
+            # Departments, locations and bands repeat across the roster, so share one string object per value
+            departments = [sys.intern(value.strip()) for value in column('Department', '')]
+            locations = [sys.intern(value.strip()) for value in column('Location', '')]
+            bands = [sys.intern(value.strip()) for value in column('Band', '')]
+            joining_dates = [value.strip() for value in column('Joining Date', '')]
+            employee_ids = [f"EMP_{number:03d}" for number in range(1, len(names) + 1)]  # generating employee IDs
+            
+            for name, department, location, band, base, performance, retention, ctc, joining_date, employee_id in zip(
+                names,
+                departments,
+                locations,
+                bands,
+                column('Base Salary (INR)', 0),
+                column('Performance Bonus (INR)', 0),
+                column('Retention Bonus (INR)', 0),
+                column('Total CTC (INR)', 0),
+                joining_dates,
+                employee_ids
+            ):
                 employee = Employee(
-                    name=row.get('Employee Name', '').strip(),
-                    position=row.get('Department', '').strip(),  
-                    department=row.get('Department', '').strip(),
-                    team=row.get('Location', '').strip(),  # using location as team
-                    salary_band=row.get('Band', '').strip(),
-                    base_salary=float(row.get('Base Salary (INR)', 0)),
-                    performance_bonus=float(row.get('Performance Bonus (INR)', 0)),
-                    retention_bonus=float(row.get('Retention Bonus (INR)', 0)),
-                    total_ctc=float(row.get('Total CTC (INR)', 0)),
-                    joining_date=row.get('Joining Date', '').strip(),
-                    employee_id=f"EMP_{len(self.employees)+1:03d}"  # generating employee ID
+                    name=name,
+                    position=department,  
+                    department=department,
+                    team=location,  # using location as team
+                    salary_band=band,
+                    base_salary=float(base),
+                    performance_bonus=float(performance),
+                    retention_bonus=float(retention),
+                    total_ctc=float(ctc),
+                    joining_date=joining_date,
+                    employee_id=employee_id,
+                    name_key=name.casefold()
                 )
                 
-                self.employees[employee.name.lower()] = employee
+                self.employees[employee.name_key] = employee
+            
+            # Built after the loop so a repeated name only appears once, like in self.employees
+            by_band = defaultdict(list)
+            for employee in self.employees.values():
+                by_band[employee.salary_band].append(employee)
+            self._by_band = dict(by_band)
+            self._all_names = list(self.employees)
             
             self.logger.info(f"Loaded {len(self.employees)} employees from {self.csv_path}")
             
@@ -70,9 +194,25 @@ class EmployeeManager:
         try:
 
             salary_bands_info = {}
+            bands = ['L1', 'L2', 'L3', 'L4', 'L5']
             
-            for band in ['L1', 'L2', 'L3', 'L4', 'L5']:
-                band_info = self._extract_band_policies(band)
+            # One embedding call and one ChromaDB query per search kind, covering every band
+            leave_results = self.vector_store.similarity_search_batch(
+                [f"{band} leave entitlement days earned sick casual annual" for band in bands],
+                n_results=3,
+                document_types=['hr_policy'],
+                min_similarity=MIN_COSINE_SIMILARITY
+            )
+            
+            travel_results = self.vector_store.similarity_search_batch(
+                [f"{band} travel allowance per diem accommodation flight domestic international" for band in bands],
+                n_results=3,
+                document_types=['hr_policy', 'travel_policy'],
+                min_similarity=MIN_COSINE_SIMILARITY
+            )
+            
+            for band, band_leave_results, band_travel_results in zip(bands, leave_results, travel_results):
+                band_info = self._extract_band_policies(band, band_leave_results, band_travel_results)
                 if band_info:
                     salary_bands_info[band] = band_info
                     
@@ -85,23 +225,9 @@ class EmployeeManager:
         except Exception as e:
             self.logger.error(f"Error extracting salary bands from policies: {str(e)}")
     
-    def _extract_band_policies(self, band: str) -> Dict:
-        """Extract policy information for a specific salary band"""
+    def _extract_band_policies(self, band: str, leave_results: List[Dict], travel_results: List[Dict]) -> Dict:
+        """Extract policy information for a specific salary band from its search results"""
         try:
-            leave_results = self.vector_store.similarity_search(
-                f"{band} leave entitlement days earned sick casual annual",
-                n_results=3,
-                document_types=['hr_policy'],
-                min_similarity=0.1
-            )
-            
-            travel_results = self.vector_store.similarity_search(
-                f"{band} travel allowance per diem accommodation flight domestic international",
-                n_results=3,
-                document_types=['hr_policy', 'travel_policy'],
-                min_similarity=0.1
-            )
-            
             band_info = {
                 'level': self._extract_level_from_results(band, leave_results + travel_results),
                 'leave_days': self._extract_leave_days(band, leave_results),
@@ -143,29 +269,19 @@ class EmployeeManager:
     
     def _extract_leave_days(self, band: str, results: List[Dict]) -> int:
         """Extract leave days from search results"""
-        import re
+        day_patterns = _leave_day_patterns(band)
         
         for result in results:
             content = result.get('content', '')
             
-            day_patterns = [
-                rf'Ban d:\s*{band}\s*\|\s*Total Leave Days:\s*(\d+)',
-                rf'ROW\s+\d+\s+DETAILS:.*?Ban d:\s*{band}\s*\|\s*Total Leave Days:\s*(\d+)',
-                rf'{band}\s*\|\s*(\d+)\s*\|',
-                rf'^\s*{band}\s+(\d+)\s+\d+\s+\d+',
-                rf'^\s*{band}\s+(\d+)',
-                rf'{band}[:\s]*(\d+)\s*days?',
-                rf'(\d+)\s*days?[^0-9]*{band}'
-            ]
-            
             for pattern in day_patterns:
-                matches = re.findall(pattern, content, re.IGNORECASE | re.MULTILINE)
+                matches = pattern.findall(content)
                 if matches:
                     for match in matches:
                         try:
                             days = int(match)
                             if 5 <= days <= 50:
-                                self.logger.info(f"Extracted {days} leave days for {band} using pattern: {pattern}")
+                                self.logger.info(f"Extracted {days} leave days for {band} using pattern: {pattern.pattern}")
                                 return days
                         except ValueError:
                             continue
@@ -181,20 +297,13 @@ class EmployeeManager:
     
     def _extract_travel_allowance(self, band: str, results: List[Dict]) -> str:
         """Extract travel allowance category from search results"""
-        import re
+        band_row_patterns = _travel_row_patterns(band)
         
         for result in results:
             content = result.get('content', '')
             
-            band_row_patterns = [
-                rf'{band}.*?Economy.*?Rs\.?\s*(\d+)',  # "L1 ... Economy Rs. 2000"
-                rf'{band}.*?Business.*?Rs\.?\s*(\d+)', # "L2 ... Business Rs. 3000"
-                rf'{band}.*?(\w+)\s+Class',            # "L3 ... Premium Class"
-                rf'{band}.*?(\w+)\s+Rs\.\s*\d+'        # "L4 Executive Rs. 5000"
-            ]
-            
             for pattern in band_row_patterns:
-                match = re.search(pattern, content, re.IGNORECASE)
+                match = pattern.search(content)
                 if match:
                     context = match.group(0).lower()
                     if 'economy' in context or '2000' in context:
@@ -206,18 +315,14 @@ class EmployeeManager:
                     elif 'executive' in context or '5000' in context:
                         return 'Executive'
         
-        allowance_keywords = {
-            'standard': ['standard', 'basic', 'regular', 'economy', '2000'],
-            'enhanced': ['enhanced', 'improved', 'better', 'business', '3000'],
-            'premium': ['premium', 'senior', 'advanced', '4000'],
-            'executive': ['executive', 'lead', 'management', '5000'],
-            'executive plus': ['executive plus', 'top tier', 'highest', '6000']
-        }
-        
         for result in results:
             content = result.get('content', '').lower()
-            for allowance_type, keywords in allowance_keywords.items():
-                if any(keyword in content for keyword in keywords):
+            found_tiers = set()
+            for keyword in _ALLOWANCE_KEYWORD_RE.findall(content):
+                found_tiers |= _ALLOWANCE_KEYWORD_TIERS[keyword]
+            
+            for allowance_type in ALLOWANCE_KEYWORDS:
+                if allowance_type in found_tiers:
                     self.logger.info(f"Extracted travel allowance '{allowance_type}' for {band}")
                     return allowance_type.title()
         
@@ -226,7 +331,7 @@ class EmployeeManager:
     
     def find_employee(self, name: str) -> Optional[Employee]:
         """Find employee by name (case-insensitive)"""
-        return self.employees.get(name.lower())
+        return self.employees.get(name.casefold())
     
     def get_employee_context(self, employee_name: str) -> Dict:
         """
@@ -267,18 +372,16 @@ class EmployeeManager:
     
     def _get_applicable_policies(self, employee: Employee) -> Dict:
         """Determine which policies apply to this employee"""
-        return {
-            'leave_policy': True,
-            'travel_policy': True,
-            'wfh_policy': employee.salary_band in ['L2', 'L3', 'L4', 'L5'],
-            'flexible_hours': employee.salary_band in ['L3', 'L4', 'L5']
-        }
+        return BAND_POLICIES.get(employee.salary_band, DEFAULT_POLICIES)
     
     def list_all_employees(self) -> List[str]:
-        """Get list of all employee names"""
-        return list(self.employees.keys())
+        """Get list of all employee names (shared list; do not modify)"""
+        return self._all_names
+    
+    def count_employees(self) -> int:
+        """Number of loaded employees, without building the name list"""
+        return len(self.employees)
     
     def get_employees_by_band(self, salary_band: str) -> List[Employee]:
-        """Get all employees in a specific salary band"""
-        return [emp for emp in self.employees.values() 
-                if emp.salary_band == salary_band]
\ No newline at end of file
+        """Get all employees in a specific salary band (shared list; do not modify)"""
+        return self._by_band.get(salary_band, [])
\ No newline at end of file
@@ -1,10 +1,30 @@
 import pdfplumber
 import PyPDF2
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Union, Tuple, Optional, Callable
 from pathlib import Path
+import io
+import os
+import mmap
+import functools
+import multiprocessing
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
 
+# Filename keyword -> document type, checked in order so earlier entries win
+# ("HR Travel Policy.pdf" is an hr_policy because "policy" precedes "travel")
+DOCUMENT_TYPE_KEYWORDS = (
+    ("leave", "hr_policy"),
+    ("policy", "hr_policy"),
+    ("travel", "travel_policy"),
+    ("offer", "offer_template"),
+)
+
+# Below this many files, parsing serially beats paying for worker process startup
+# (a spawned worker takes ~0.4s to start, about as long as parsing one policy PDF)
+PROCESS_POOL_MIN_FILES = 8
+
 @dataclass
 class DocumentMetadata:
     filename: str
@@ -21,7 +41,8 @@ class ParsedDocument:
 class PDFParser:
     """Enhanced PDF parser using pdfplumber for better text extraction"""
     
-    def __init__(self):
+    def __init__(self, detect_tables: bool = True):
+        self.detect_tables = detect_tables
         self.logger = logging.getLogger(__name__)
     
     def parse_pdf(self, file_path: str) -> ParsedDocument:
@@ -37,43 +58,72 @@ class PDFParser:
         file_path = Path(file_path)
         
         try:
-            with pdfplumber.open(file_path) as pdf:
+            # Map the file once and parse from memory instead of re-reading it through the path
+            with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return self.parse_pdf_bytes(data, file_path.name)
+                
+        except Exception as e:
+            self.logger.error(f"Error parsing PDF {file_path}: {str(e)}")
+            raise
+    
+    def parse_pdf_bytes(self, data: Union[bytes, mmap.mmap], filename: str) -> ParsedDocument:
+        """
+        Parse a PDF already held in memory (bytes or a memory-mapped file)
+        
+        Args:
+            data: PDF file contents
+            filename: Original file name, used for metadata and document type
+            
+        Returns:
+            ParsedDocument with content and metadata
+        """
+        stream = data if isinstance(data, mmap.mmap) else io.BytesIO(data)
+        
+        try:
+            with pdfplumber.open(stream) as pdf:
                 pages = []
-                full_content = ""
+                full_content_parts = []
                 
                 for page_num, page in enumerate(pdf.pages, 1):
                     page_text = page.extract_text()
                     
-                    tables = page.extract_tables()
-                    enhanced_page_text = page_text if page_text else ""
+                    # Image-only pages have no characters to put in table cells, and
+                    # ruled-table detection needs drawn edges, so skip the costly table pass otherwise
+                    has_table_edges = bool(page.lines or page.rects or page.curves)
+                    if self.detect_tables and page.chars and has_table_edges:
+                        tables = page.extract_tables()
+                    else:
+                        tables = []
+                    
+                    page_parts = [page_text] if page_text else []
                     
-                    if tables:
-                        for table_idx, table in enumerate(tables):
-                            enhanced_page_text += f"\n\n=== TABLE {table_idx + 1} ON PAGE {page_num} ===\n"
-                            enhanced_page_text += self._format_table_for_search(table)
-                            enhanced_page_text += "\n=== END TABLE ===\n"
+                    for table_idx, table in enumerate(tables):
+                        page_parts.append(f"\n\n=== TABLE {table_idx + 1} ON PAGE {page_num} ===\n")
+                        page_parts.append(self._format_table_for_search(table))
+                        page_parts.append("\n=== END TABLE ===\n")
                     
-                    if enhanced_page_text:
-                        pages.append(enhanced_page_text.strip())
-                        full_content += f"\n--- Page {page_num} ---\n{enhanced_page_text.strip()}\n"
+                    if page_parts:
+                        enhanced_page_text = "".join(page_parts).strip()
+                        pages.append(enhanced_page_text)
+                        full_content_parts.append(f"\n--- Page {page_num} ---\n{enhanced_page_text}\n")
                 
                 metadata = DocumentMetadata(
-                    filename=file_path.name,
+                    filename=filename,
                     page_count=len(pdf.pages),
-                    file_size=file_path.stat().st_size,
-                    document_type=self._determine_document_type(file_path.name)
+                    file_size=len(data),
+                    document_type=self._determine_document_type(filename)
                 )
                 
-                self.logger.info(f"Successfully parsed {file_path.name}: {len(pages)} pages")
+                self.logger.info(f"Successfully parsed {filename}: {len(pages)} pages")
                 
                 return ParsedDocument(
-                    content=full_content.strip(),
+                    content="".join(full_content_parts).strip(),
                     metadata=metadata,
                     pages=pages
                 )
                 
         except Exception as e:
-            self.logger.error(f"Error parsing PDF {file_path}: {str(e)}")
+            self.logger.error(f"Error parsing PDF {filename}: {str(e)}")
             raise
     
     def _format_table_for_search(self, table) -> str:
@@ -110,33 +160,84 @@ class PDFParser:
         if not cell:
             return ""
         
-        cleaned = str(cell).replace('\n', ' ').replace('\r', ' ')
-        cleaned = ' '.join(cleaned.split())
-        return cleaned.strip()
+        # str.split() already breaks on newlines and carriage returns, and joining
+        # its pieces leaves nothing to strip, so one pass collapses all whitespace
+        return ' '.join(str(cell).split())
     
     def _determine_document_type(self, filename: str) -> str:
         """Determine document type based on filename"""
         filename_lower = filename.lower()
         
-        if "leave" in filename_lower or "policy" in filename_lower:
-            return "hr_policy"
-        elif "travel" in filename_lower:
-            return "travel_policy"  
-        elif "offer" in filename_lower:
-            return "offer_template"
-        else:
-            return "unknown"
+        return next(
+            (document_type for keyword, document_type in DOCUMENT_TYPE_KEYWORDS if keyword in filename_lower),
+            "unknown"
+        )
     
-    def parse_multiple_pdfs(self, file_paths: List[str]) -> List[ParsedDocument]:
-        """Parse multiple PDF files"""
-        documents = []
+    def parse_multiple_pdfs(self, file_paths: List[str], with_errors: bool = False) -> List[Any]:
+        """
+        Parse multiple PDF files, in worker processes for large batches
+        
+        Small batches, or machines with a single CPU, are parsed serially: worker
+        startup would cost more than it saves. Workers are spawned rather than
+        forked, since callers such as the Streamlit app have torch,
+        sentence-transformers and chromadb threads running, which are unsafe to
+        fork. Falls back to parsing in this process if workers cannot start.
+        
+        Args:
+            file_paths: PDF files to parse
+            with_errors: Return one (ParsedDocument or None, error message or None)
+                pair per input instead of skipping files that fail to parse
+            
+        Returns:
+            Parsed documents in input order
+        """
+        cpu_count = os.cpu_count() or 1
         
-        for file_path in file_paths:
+        if len(file_paths) < PROCESS_POOL_MIN_FILES or cpu_count < 2:
+            outcomes = self._parse_serially(file_paths)
+        else:
             try:
-                doc = self.parse_pdf(file_path)
-                documents.append(doc)
-            except Exception as e:
-                self.logger.error(f"Failed to parse {file_path}: {str(e)}")
-                continue
-                
-        return documents
\ No newline at end of file
+                with ProcessPoolExecutor(
+                    max_workers=min(len(file_paths), cpu_count),
+                    mp_context=multiprocessing.get_context("spawn")
+                ) as executor:
+                    futures = [
+                        executor.submit(parse_pdf_worker, str(file_path), self.detect_tables)
+                        for file_path in file_paths
+                    ]
+                    outcomes = [
+                        self._parse_outcome(file_path, future.result)
+                        for file_path, future in zip(file_paths, futures)
+                    ]
+                    
+            except (BrokenProcessPool, OSError) as e:
+                self.logger.warning(f"Process pool unavailable, parsing PDFs serially: {str(e)}")
+                outcomes = self._parse_serially(file_paths)
+        
+        if with_errors:
+            return outcomes
+        return [doc for doc, _ in outcomes if doc is not None]
+    
+    def _parse_serially(self, file_paths: List[str]) -> List[Tuple[Optional[ParsedDocument], Optional[str]]]:
+        """Parse PDF files one after another in this process"""
+        return [
+            self._parse_outcome(file_path, functools.partial(self.parse_pdf, file_path))
+            for file_path in file_paths
+        ]
+    
+    def _parse_outcome(self,
+                       file_path: str,
+                       parse: Callable[[], ParsedDocument]) -> Tuple[Optional[ParsedDocument], Optional[str]]:
+        """Run one parse, turning document errors into (None, error message)"""
+        try:
+            return parse(), None
+        except BrokenProcessPool:
+            raise
+        except Exception as e:
+            self.logger.error(f"Failed to parse {file_path}: {str(e)}")
+            return None, f"Error processing {Path(file_path).name}: {str(e)}"
+
+
+def parse_pdf_worker(file_path: str, detect_tables: bool = True) -> ParsedDocument:
+    """Parse one PDF in a worker process, with a parser created in that process"""
+    return PDFParser(detect_tables=detect_tables).parse_pdf(file_path)
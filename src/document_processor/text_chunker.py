@@ -1,8 +1,19 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Pattern
 from dataclasses import dataclass
 import re
 from config import settings
 
+_WHITESPACE_RE = re.compile(r'\s+')
+_WORD_RE = re.compile(r'\S+')
+
+# Section boundaries in HR policy documents, tried in order; each is one capturing
+# group so re.split keeps the headings as sections of their own
+SECTION_PATTERNS = [
+    re.compile(r'(\n\d+\.\s+[A-Z][^.\n]*\n)'),  # "1. SECTION TITLE"  
+    re.compile(r'(\n[A-Z][A-Z\s]{3,}:\n)'),      # "SECTION TITLE:"
+    re.compile(r'(\n[A-Z][A-Z\s]{3,}\n\n)'),     # "SECTION TITLE" (standalone)
+]
+
 @dataclass
 class TextChunk:
     content: str
@@ -49,13 +60,7 @@ class IntelligentTextChunker:
         chunks = []
         content = parsed_doc.content
         
-        section_patterns = [
-            r'\n\d+\.\s+[A-Z][^.\n]*\n',  # "1. SECTION TITLE"  
-            r'\n[A-Z][A-Z\s]{3,}:\n',      # "SECTION TITLE:"
-            r'\n[A-Z][A-Z\s]{3,}\n\n',     # "SECTION TITLE" (standalone)
-        ]
-        
-        sections = self._split_by_patterns(content, section_patterns)
+        sections = self._split_by_patterns(content, SECTION_PATTERNS)
         
         for i, section in enumerate(sections):
             if len(section.strip()) < 50:
@@ -111,40 +116,42 @@ class IntelligentTextChunker:
         return chunks
     
     def _sliding_window_chunk_text(self, text: str) -> List[str]:
-        """Split text using sliding window approach"""
+        """
+        Split text using sliding window approach
+        
+        Whitespace is collapsed once for the whole text and windows are sliced out
+        by word offsets, rather than splitting into words and re-joining each window.
+        """
         chunks = []
-        words = text.split()
+        normalized = _WHITESPACE_RE.sub(' ', text).strip()
+        word_starts = [match.start() for match in _WORD_RE.finditer(normalized)]
+        word_count = len(word_starts)
         
-        if len(words) <= self.chunk_size:
+        if word_count <= self.chunk_size:
             return [text]
             
-        for i in range(0, len(words), self.chunk_size - self.overlap):
-            chunk_words = words[i:i + self.chunk_size]
-            chunk_text = ' '.join(chunk_words)
-            chunks.append(chunk_text)
+        for i in range(0, word_count, self.chunk_size - self.overlap):
+            window_end = i + self.chunk_size
+            # A window ends just before the single space preceding the next window's first word
+            end = word_starts[window_end] - 1 if window_end < word_count else len(normalized)
+            chunks.append(normalized[word_starts[i]:end])
             
-            if i + self.chunk_size >= len(words):
+            if window_end >= word_count:
                 break
                 
         return chunks
     
-    def _split_by_patterns(self, text: str, patterns: List[str]) -> List[str]:
-        """Split text by regex patterns"""
+    def _split_by_patterns(self, text: str, patterns: List[Pattern]) -> List[str]:
+        """
+        Split text on the first pattern that matches, keeping the matched headings
+        
+        Patterns must wrap the whole expression in one capturing group. Patterns are
+        not merged into a single alternation: the first pattern with any match
+        decides the split on its own, as a fallback chain.
+        """
         for pattern in patterns:
-            matches = list(re.finditer(pattern, text))
-            if matches:
-                sections = []
-                last_end = 0
-                
-                for match in matches:
-                    if match.start() > last_end:
-                        sections.append(text[last_end:match.start()])
-                    sections.append(text[match.start():match.end()])
-                    last_end = match.end()
-                    
-                if last_end < len(text):
-                    sections.append(text[last_end:])
-                    
-                return [s for s in sections if s.strip()]
+            parts = pattern.split(text)
+            if len(parts) > 1:
+                return [s for s in parts if s.strip()]
                 
-        return [text]
\ No newline at end of file
+        return [text]
@@ -3,9 +3,12 @@ Embeddings and vector database module for document retrieval and similarity sear
 """
 
 from .embedding_manager import EmbeddingManager
-from .vector_store import VectorStore
+from .vector_store import VectorStore, RelevantPolicies, configure_hnsw_params, MIN_COSINE_SIMILARITY
 
 __all__ = [
     "EmbeddingManager",
-    "VectorStore"
+    "VectorStore",
+    "RelevantPolicies",
+    "configure_hnsw_params",
+    "MIN_COSINE_SIMILARITY"
 ] 
\ No newline at end of file
@@ -1,11 +1,37 @@
 from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
 import logging
+import threading
+import atexit
+import os
+import re
+import tempfile
+import weakref
+from collections import OrderedDict
 from pathlib import Path
 import pickle
 from config import settings
 
+# Distinct cleaned query strings whose embeddings are kept in memory
+QUERY_EMBEDDING_CACHE_SIZE = 4096
+
+# New query embeddings accumulated before the cache is written back to disk; anything
+# still unsaved is written by the exit hook
+QUERY_CACHE_FLUSH_INTERVAL = 32
+
+# Serializes query cache writes across managers, which may share a cache file
+_QUERY_CACHE_FLUSH_LOCK = threading.Lock()
+
+# Managers whose query caches are flushed at exit; weak so the hook keeps none alive
+_LIVE_MANAGERS: "weakref.WeakSet[EmbeddingManager]" = weakref.WeakSet()
+
+@atexit.register
+def _flush_query_caches():
+    """Save every live manager's unsaved query embeddings at interpreter exit"""
+    for manager in list(_LIVE_MANAGERS):
+        manager.flush_query_cache()
+
 class EmbeddingManager:
     
     
@@ -16,7 +42,17 @@ class EmbeddingManager:
         
         self.logger = logging.getLogger(__name__)
         self.model = None
+        
+        # Query strings are mostly fixed templates parameterized by band, so the
+        # same handful of embeddings is requested over and over; keyed by
+        # (model name, cleaned query) so swapping the model never serves stale vectors
+        self._query_cache: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._query_cache_lock = threading.Lock()
+        self._unsaved_query_embeddings = 0
+        
         self._load_model()
+        self._load_query_cache()
+        _LIVE_MANAGERS.add(self)
     
     def _load_model(self):
         
@@ -34,7 +70,8 @@ class EmbeddingManager:
             return np.array([])
         
         try:
-            clean_texts = [self._clean_text(text) for text in texts if text.strip()]
+            # Cleaning yields an empty string exactly for blank texts, so clean and filter in one pass
+            clean_texts = [cleaned for cleaned in map(self._clean_text, texts) if cleaned]
             
             if not clean_texts:
                 self.logger.warning("No valid texts to embed after cleaning")
@@ -44,8 +81,9 @@ class EmbeddingManager:
             embeddings = self.model.encode(
                 clean_texts,
                 batch_size=batch_size,
-                show_progress_bar=True,
-                convert_to_numpy=True
+                show_progress_bar=False,
+                convert_to_numpy=True,
+                normalize_embeddings=True
             )
             
             self.logger.info(f"Generated embeddings shape: {embeddings.shape}")
@@ -58,36 +96,155 @@ class EmbeddingManager:
     def generate_query_embedding(self, query: str) -> np.ndarray:
        
         try:
-            clean_query = self._clean_text(query)
-            if not clean_query.strip():
+            return self.generate_query_embeddings([query])[0]
+            
+        except Exception as e:
+            self.logger.error(f"Error generating query embedding: {str(e)}")
+            raise
+    
+    def generate_query_embeddings(self, queries: List[str]) -> np.ndarray:
+        """
+        Embed several queries in a single encode call, preserving order
+        
+        Embeddings are cached per cleaned query string; only queries not seen
+        recently are sent to the model.
+        """
+        
+        try:
+            clean_queries = [self._clean_text(query) for query in queries]
+            if not all(query.strip() for query in clean_queries):
                 raise ValueError("Empty query after cleaning")
             
-            embedding = self.model.encode([clean_query], convert_to_numpy=True)
-            return embedding[0]
+            embeddings = {}
+            with self._query_cache_lock:
+                for query in clean_queries:
+                    cached = self._query_cache.get((self.model_name, query))
+                    if cached is not None:
+                        self._query_cache.move_to_end((self.model_name, query))
+                        embeddings[query] = cached
+            
+            misses = [query for query in dict.fromkeys(clean_queries) if query not in embeddings]
+            if misses:
+                encoded = self.model.encode(misses, convert_to_numpy=True, normalize_embeddings=True)
+                with self._query_cache_lock:
+                    for query, embedding in zip(misses, encoded):
+                        embedding.setflags(write=False)
+                        embeddings[query] = embedding
+                        self._query_cache[(self.model_name, query)] = embedding
+                        self._query_cache.move_to_end((self.model_name, query))
+                    while len(self._query_cache) > QUERY_EMBEDDING_CACHE_SIZE:
+                        self._query_cache.popitem(last=False)
+                    self._unsaved_query_embeddings += len(misses)
+                    flush = self._unsaved_query_embeddings >= QUERY_CACHE_FLUSH_INTERVAL
+                
+                if flush:
+                    self.flush_query_cache()
+            
+            return np.stack([embeddings[query] for query in clean_queries])
             
         except Exception as e:
-            self.logger.error(f"Error generating query embedding: {str(e)}")
+            self.logger.error(f"Error generating query embeddings: {str(e)}")
             raise
     
+    def _query_cache_path(self) -> Path:
+        """On-disk query embedding cache; one file per model so vectors never mix"""
+        
+        return self.cache_dir / f"query_embeddings_{re.sub(r'[^A-Za-z0-9_.-]', '_', self.model_name)}.npz"
+    
+    def _load_query_cache(self):
+        """Warm the query embedding cache from the last session, if it was saved"""
+        
+        filepath = self._query_cache_path()
+        if not filepath.exists():
+            return
+        
+        try:
+            with np.load(filepath, allow_pickle=False) as data:
+                queries = data['queries'].tolist()
+                embeddings = data['embeddings']
+            
+            with self._query_cache_lock:
+                for query, embedding in zip(queries, embeddings):
+                    embedding.setflags(write=False)
+                    self._query_cache.setdefault((self.model_name, query), embedding)
+                while len(self._query_cache) > QUERY_EMBEDDING_CACHE_SIZE:
+                    self._query_cache.popitem(last=False)
+            
+            self.logger.info(f"Loaded {len(queries)} cached query embeddings from {filepath}")
+        except Exception as e:
+            self.logger.warning(f"Could not load query embedding cache: {str(e)}")
+    
+    def flush_query_cache(self):
+        """
+        Write the query embedding cache to disk, oldest entries first
+        
+        Queries are stored as a string array next to the embeddings in one .npz,
+        written to a uniquely named temporary file and moved into place, so a
+        crash or a concurrent flush never leaves a torn file.
+        """
+        
+        with _QUERY_CACHE_FLUSH_LOCK:
+            with self._query_cache_lock:
+                unsaved = self._unsaved_query_embeddings
+                if not unsaved:
+                    return
+                entries = [(query, embedding) for (model_name, query), embedding in self._query_cache.items()
+                           if model_name == self.model_name]
+                self._unsaved_query_embeddings = 0
+            
+            if not entries:
+                return
+            
+            filepath = self._query_cache_path()
+            temp_path = None
+            try:
+                with tempfile.NamedTemporaryFile(dir=self.cache_dir, prefix=f"{filepath.name}.",
+                                                 suffix=".tmp", delete=False) as f:
+                    temp_path = Path(f.name)
+                    np.savez(
+                        f,
+                        queries=np.array([query for query, _ in entries]),
+                        embeddings=np.stack([embedding for _, embedding in entries])
+                    )
+                os.replace(temp_path, filepath)
+                self.logger.info(f"Saved {len(entries)} query embeddings to {filepath}")
+            except Exception as e:
+                if temp_path is not None:
+                    temp_path.unlink(missing_ok=True)
+                # Keep the entries counted as unsaved so a later flush retries them
+                with self._query_cache_lock:
+                    self._unsaved_query_embeddings += unsaved
+                self.logger.warning(f"Could not save query embedding cache: {str(e)}")
+    
     def _clean_text(self, text: str) -> str:
         
         if not text:
             return ""
         
-        cleaned = text.strip()
+        # split() already drops leading and trailing whitespace
+        cleaned = ' '.join(text.split())
         
-        cleaned = ' '.join(cleaned.split())
-        
-        if len(cleaned) > 2000:
-            cleaned = cleaned[:2000] + "..."
-            
-        return cleaned
+        # Well past the model's token window, so the cut is never seen by the encoder
+        return cleaned[:2000]
     
     def compute_similarity(self, 
                           embedding1: np.ndarray, 
-                          embedding2: np.ndarray) -> float:
+                          embedding2: np.ndarray,
+                          normalized: bool = True) -> float:
+        """
+        Cosine similarity of two embeddings
+        
+        Embeddings produced by this manager are unit length, so by default the
+        cosine is just their dot product; pass normalized=False for other vectors.
+        """
        
         try:
+            if embedding1.size == 0 or embedding2.size == 0:
+                return 0.0
+            
+            if normalized:
+                return float(np.dot(embedding1, embedding2))
+            
             norm1 = np.linalg.norm(embedding1)
             norm2 = np.linalg.norm(embedding2)
             
@@ -101,29 +258,51 @@ class EmbeddingManager:
             self.logger.error(f"Error computing similarity: {str(e)}")
             return 0.0
     
+    def _embedding_files(self, filename: str) -> Dict[str, Path]:
+        """Cache file for each on-disk format: float32 .npy and legacy pickle"""
+        
+        return {
+            'npy': self.cache_dir / f"{filename}.npy",
+            'pkl': self.cache_dir / f"{filename}.pkl"
+        }
+    
     def save_embeddings(self, embeddings: np.ndarray, filename: str):
+        """Save embeddings as a float32 .npy instead of a pickle, so loads can memory-map it"""
         
         try:
-            filepath = self.cache_dir / f"{filename}.pkl"
-            with open(filepath, 'wb') as f:
-                pickle.dump(embeddings, f)
+            files = self._embedding_files(filename)
+            filepath = files['npy']
+            np.save(filepath, np.asarray(embeddings, dtype=np.float32), allow_pickle=False)
+            
+            # Only one format may exist per name, or a load could pick up a stale file
+            for stale in files.values():
+                if stale != filepath:
+                    stale.unlink(missing_ok=True)
+            
             self.logger.info(f"Embeddings saved to {filepath}")
         except Exception as e:
             self.logger.error(f"Error saving embeddings: {str(e)}")
             raise
     
     def load_embeddings(self, filename: str) -> Optional[np.ndarray]:
+        """Load saved embeddings; .npy files are memory-mapped read-only"""
         
         try:
-            filepath = self.cache_dir / f"{filename}.pkl"
-            if filepath.exists():
+            files = self._embedding_files(filename)
+            
+            if files['npy'].exists():
+                filepath = files['npy']
+                embeddings = np.load(filepath, mmap_mode='r', allow_pickle=False)
+            elif files['pkl'].exists():
+                filepath = files['pkl']
                 with open(filepath, 'rb') as f:
                     embeddings = pickle.load(f)
-                self.logger.info(f"Embeddings loaded from {filepath}")
-                return embeddings
             else:
-                self.logger.warning(f"Embeddings file not found: {filepath}")
+                self.logger.warning(f"Embeddings file not found: {files['npy']}")
                 return None
+            
+            self.logger.info(f"Embeddings loaded from {filepath}")
+            return embeddings
         except Exception as e:
             self.logger.error(f"Error loading embeddings: {str(e)}")
             return None
@@ -1,19 +1,129 @@
 import chromadb
+import numpy as np
 from chromadb.config import Settings as ChromaSettings
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Pattern, FrozenSet
 import logging
+import os
+import re
+import functools
+import threading
 from pathlib import Path
 import uuid
+import hashlib
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import asdict
 from src.document_processor import TextChunk
 from .embedding_manager import EmbeddingManager
 from config import settings
 
+# Leading characters of a chunk shown where a policy is quoted in full prompts
+POLICY_PREVIEW_CHARS = 500
+
+# Policy categories retrieved for every offer letter, in prompt order
+POLICY_QUERY_TYPES = ('leave_policy', 'travel_policy', 'work_arrangements', 'infrastructure_support')
+
+# Cosine similarity floor that keeps every hit. Callers' 0.05 and 0.1 cut-offs were set
+# for the old 1 / (1 + squared L2) score, which never falls below 0.2 for unit vectors,
+# so they never dropped a result; their cosine equivalents, (3 - 1 / t) / 2, lie below -1
+MIN_COSINE_SIMILARITY = -1.0
+
+# Recent searches kept for near-duplicate queries
+SEARCH_CACHE_SIZE = 256
+
+# Metadata records fetched per call when tallying document types
+STATS_PAGE_SIZE = 10000
+
+BAND_LABELS = ('L1', 'L2', 'L3', 'L4', 'L5')
+
+# Words marking summary tables, which are worth a small boost when they mention the band
+TABLE_PATTERNS = ("matrix", "table", "entitlement", "policy summary")
+
+_BAND_TOKEN_RE = re.compile(r'l[1-5]')
+
+@functools.lru_cache(maxsize=32)
+def _band_context_regex(band_lower: str) -> Pattern:
+    """
+    One pattern for every phrasing that ties content to a band
+    
+    The alternation sits in a lookahead so overlapping phrasings are all found;
+    no phrasing is a prefix of another, so each occurrence is reported as itself.
+    """
+    phrasings = [
+        f"{band_lower} employees",
+        f"{band_lower} band",
+        f"for {band_lower}",
+        f"{band_lower} level",
+        f"{band_lower} staff",
+        f"{band_lower}:",
+        f"level {band_lower}",
+        f"band {band_lower}"
+    ]
+    return re.compile('(?=(' + '|'.join(re.escape(phrasing) for phrasing in phrasings) + '))')
+
+@functools.lru_cache(maxsize=1024)
+def _band_context_score(content: str, band_lower: str) -> float:
+    """
+    Band context score for one chunk, memoized because the same chunk is usually
+    retrieved by several of the queries behind a single search
+    """
+    content_lower = content.lower()
+    score = 0.0
+    
+    # Each distinct phrasing present adds once, however often it repeats
+    score += 0.3 * len(set(_band_context_regex(band_lower).findall(content_lower)))
+    
+    if band_lower in content_lower:
+        for pattern in TABLE_PATTERNS:
+            if pattern in content_lower:
+                score += 0.1
+    
+    other_band_mentions = len(set(_BAND_TOKEN_RE.findall(content_lower)) - {band_lower})
+    
+    if other_band_mentions > 2:
+        score *= 0.5  
+    
+    return min(score, 1.0)
+
+class RelevantPolicies(dict):
+    """Policy type -> matching chunks, with the total chunk count computed once"""
+    
+    def __init__(self, policies: Dict[str, List[Dict[str, Any]]] = None):
+        super().__init__(policies or {})
+        self.total_chunks = sum(len(chunks) for chunks in self.values())
+
+def configure_hnsw_params(vector_count: int = None) -> Dict[str, int]:
+    """
+    HNSW index parameters for a collection of the expected size
+    
+    Small collections get a cheaper, sparser graph; anything larger, or of unknown
+    size, uses the configured defaults.
+    
+    Args:
+        vector_count: Expected number of vectors in the collection
+        
+    Returns:
+        Dict with m, ef_construction, ef_search and num_threads
+    """
+    if vector_count is not None and vector_count < 1000:
+        m, ef_construction, ef_search = 16, 64, 40
+    else:
+        m, ef_construction, ef_search = settings.hnsw_m, settings.hnsw_construction_ef, settings.hnsw_search_ef
+    
+    return {
+        "m": m,
+        "ef_construction": ef_construction,
+        "ef_search": ef_search,
+        "num_threads": os.cpu_count() or 1
+    }
+
 class VectorStore:
     
     
-    def __init__(self, collection_name: str = "fenmoai_documents", persist_directory: str = None):
+    def __init__(self, collection_name: str = "fenmoai_documents", persist_directory: str = None,
+                 hnsw_config: Dict[str, int] = None, expected_vectors: int = None):
         self.collection_name = collection_name
+        self.hnsw_config = hnsw_config or configure_hnsw_params(expected_vectors)
         self.persist_directory = Path(persist_directory or settings.vector_db_path)
         self.persist_directory.mkdir(parents=True, exist_ok=True)
         
@@ -21,6 +131,13 @@ class VectorStore:
         self.client = None
         self.collection = None
         self.embedding_manager = EmbeddingManager()
+        self._doc_type_counts: Optional[Tuple[int, Dict[str, int]]] = None
+        self._numpy_embeddings = True
+        
+        # Recent searches for near-duplicate queries, oldest first:
+        # (search parameters, query) -> (band labels, query embedding, results)
+        self._search_cache: "OrderedDict[Tuple, Tuple[FrozenSet[str], np.ndarray, List[Dict[str, Any]]]]" = OrderedDict()
+        self._search_cache_lock = threading.Lock()
         
         self._setup_chromadb()
     
@@ -36,10 +153,22 @@ class VectorStore:
                 )
             )
             
-            self.collection = self.client.get_or_create_collection(
-                name=self.collection_name,
-                metadata={"description": "FenmoAI HR documents and policies"}
-            )
+            # HNSW parameters and the distance space are fixed when a collection is built,
+            # so they are only applied to new collections; an existing index keeps its
+            # settings until reset
+            try:
+                self.collection = self.client.get_collection(name=self.collection_name)
+            except Exception:
+                self.collection = self.client.create_collection(
+                    name=self.collection_name,
+                    metadata=self._collection_metadata()
+                )
+            self._distance_space = self._collection_distance_space()
+            if self._distance_space != "cosine":
+                self.logger.warning(
+                    f"Collection {self.collection_name} uses the {self._distance_space} distance space; "
+                    "reset the vector store to rebuild it with cosine distance and the configured HNSW parameters"
+                )
             
             self.logger.info(f"ChromaDB initialized: {self.collection_name}")
             self.logger.info(f"Collection has {self.collection.count()} documents")
@@ -48,49 +177,136 @@ class VectorStore:
             self.logger.error(f"Failed to initialize ChromaDB: {str(e)}")
             raise
     
-    def add_chunks(self, chunks: List[TextChunk], batch_size: int = 100) -> int:
+    def _collection_metadata(self) -> Dict[str, Any]:
+        """Collection metadata including the HNSW index parameters"""
+        
+        metadata = {
+            "description": "FenmoAI HR documents and policies",
+            "hnsw:space": "cosine",
+            "hnsw:M": self.hnsw_config["m"],
+            "hnsw:construction_ef": self.hnsw_config["ef_construction"],
+            "hnsw:search_ef": self.hnsw_config["ef_search"]
+        }
+        if self.hnsw_config.get("num_threads"):
+            metadata["hnsw:num_threads"] = self.hnsw_config["num_threads"]
+        
+        return metadata
+    
+    def _collection_distance_space(self) -> str:
+        """Distance function the current collection was built with (ChromaDB defaults to l2)"""
+        
+        return (self.collection.metadata or {}).get("hnsw:space", "l2")
+    
+    def _distances_to_similarities(self, distances: List[float]) -> np.ndarray:
+        """
+        Convert one query's ChromaDB distances to cosine similarities
+        
+        Embeddings are unit length, so cosine and inner product distances are
+        1 - cos, and squared L2 distance (collections built before the switch to
+        cosine) is 2 - 2 * cos.
+        """
+        
+        distances = np.asarray(distances, dtype=np.float64)
+        if self._distance_space == "l2":
+            similarities = 1.0 - 0.5 * distances
+        else:
+            similarities = 1.0 - distances
+        
+        # Index distances carry float error, so exact matches can land just past 1.
+        # Negative cosines stay in range, so the default MIN_COSINE_SIMILARITY floor
+        # still returns anti-correlated hits, as the old always-positive score did
+        return np.clip(similarities, -1.0, 1.0, out=similarities)
+    
+    def add_chunks(self, chunks: List[TextChunk], batch_size: int = 100, prefetch: int = 1) -> int:
+        """
+        Embed and store chunks in slices of batch_size
+        
+        Up to prefetch encoded slices wait on the writer thread while the next slice
+        is encoded; prefetch=0 writes each slice before encoding the next.
+        """
         
         if not chunks:
             self.logger.warning("No chunks to add")
             return 0
         
         try:
+            # Empty chunks are dropped by the embedder, so filter them here to keep ids aligned
+            valid_chunks = [chunk for chunk in chunks if chunk.content.strip()]
+            if len(valid_chunks) < len(chunks):
+                self.logger.warning(f"Skipping {len(chunks) - len(valid_chunks)} empty chunks")
+            
+            if not valid_chunks:
+                return 0
+            
+            texts = []
+            chunk_ids = []
+            metadatas = []
+            for chunk in valid_chunks:
+                texts.append(chunk.content)
+                chunk_ids.append(chunk.chunk_id or self._fallback_chunk_id(chunk))
+                # Later entries win: chunk metadata overrides the derived fields, and
+                # the preview always reflects the stored content
+                metadatas.append({
+                    "source_document": chunk.source_document,
+                    "document_type": chunk.document_type,
+                    "page_number": chunk.page_number,
+                    "chunk_index": chunk.chunk_index,
+                    "chunking_method": chunk.metadata.get("chunking_method", "unknown"),
+                    **self._band_metadata(chunk.content),
+                    **chunk.metadata,
+                    "preview": chunk.content[:POLICY_PREVIEW_CHARS]
+                })
+            
+            # Slices are written in order on one background thread while later
+            # slices are encoded, with at most prefetch writes outstanding
             added_count = 0
+            pending_writes = deque()
             
-            for i in range(0, len(chunks), batch_size):
-                batch_chunks = chunks[i:i + batch_size]
-                
-                texts = [chunk.content for chunk in batch_chunks]
-                chunk_ids = [chunk.chunk_id or f"chunk_{uuid.uuid4()}" for chunk in batch_chunks]
-                
-                metadatas = []
-                for chunk in batch_chunks:
-                    metadata = {
-                        "source_document": chunk.source_document,
-                        "document_type": chunk.document_type,
-                        "page_number": chunk.page_number,
-                        "chunk_index": chunk.chunk_index,
-                        "chunking_method": chunk.metadata.get("chunking_method", "unknown")
-                    }
-                    metadata.update(chunk.metadata)
-                    metadatas.append(metadata)
-                
-                self.logger.info(f"Processing batch {i//batch_size + 1}: {len(batch_chunks)} chunks")
-                embeddings = self.embedding_manager.generate_embeddings(texts)
-                
-                if embeddings.size == 0:
-                    self.logger.warning(f"No embeddings generated for batch {i//batch_size + 1}")
-                    continue
-                
-                self.collection.add(
-                    documents=texts,
-                    embeddings=embeddings.tolist(),
-                    metadatas=metadatas,
-                    ids=chunk_ids
-                )
+            # Boilerplate repeats across documents, so identical chunk texts are encoded once per call
+            embeddings_by_hash = {}
+            
+            with ThreadPoolExecutor(max_workers=1) as writer:
+                for i in range(0, len(valid_chunks), batch_size):
+                    batch_texts = texts[i:i + batch_size]
+                    batch_hashes = [
+                        hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest() for text in batch_texts
+                    ]
+                    
+                    new_texts = {}
+                    for text_hash, text in zip(batch_hashes, batch_texts):
+                        if text_hash not in embeddings_by_hash:
+                            new_texts.setdefault(text_hash, text)
+                    
+                    if new_texts:
+                        new_embeddings = self.embedding_manager.generate_embeddings(
+                            list(new_texts.values()), batch_size=settings.embedding_batch_size
+                        )
+                        
+                        if new_embeddings.size == 0:
+                            self.logger.warning("No embeddings generated for chunks")
+                            continue
+                        
+                        embeddings_by_hash.update(zip(new_texts, new_embeddings))
+                    
+                    embeddings = np.stack([embeddings_by_hash[text_hash] for text_hash in batch_hashes])
+                    
+                    while pending_writes and len(pending_writes) >= max(prefetch, 1):
+                        added_count += pending_writes.popleft().result()
+                    
+                    pending_writes.append(writer.submit(
+                        self._write_batch,
+                        batch_texts,
+                        embeddings,
+                        metadatas[i:i + batch_size],
+                        chunk_ids[i:i + batch_size],
+                        i // batch_size + 1
+                    ))
+                    
+                    if prefetch <= 0:
+                        added_count += pending_writes.popleft().result()
                 
-                added_count += len(batch_chunks)
-                self.logger.info(f"Added {len(batch_chunks)} chunks to vector store")
+                while pending_writes:
+                    added_count += pending_writes.popleft().result()
             
             self.logger.info(f"Successfully added {added_count} chunks to vector store")
             return added_count
@@ -99,60 +315,222 @@ class VectorStore:
             self.logger.error(f"Error adding chunks to vector store: {str(e)}")
             raise
     
+    def _fallback_chunk_id(self, chunk: TextChunk) -> str:
+        """
+        Id for a chunk the chunker left unnamed
+        
+        Source document and chunk index identify a chunk across ingests, so re-adding
+        the same document reuses its ids; chunks with no source get a random id.
+        """
+        if chunk.source_document:
+            return f"{chunk.source_document}_chunk_{chunk.chunk_index}"
+        return uuid.uuid4().hex
+    
+    def _write_batch(self, 
+                     texts: List[str], 
+                     embeddings: np.ndarray, 
+                     metadatas: List[Dict[str, Any]], 
+                     ids: List[str],
+                     batch_number: int) -> int:
+        """Write one slice of embedded chunks to the collection"""
+        
+        self._with_embeddings(
+            self.collection.add,
+            "embeddings",
+            embeddings,
+            documents=texts,
+            metadatas=metadatas,
+            ids=ids
+        )
+        self._invalidate_search_cache()
+        
+        self.logger.info(f"Added batch {batch_number}: {len(texts)} chunks to vector store")
+        return len(texts)
+    
+    def _with_embeddings(self, method, keyword: str, embeddings: np.ndarray, **kwargs):
+        """
+        Call a collection method with embeddings as a NumPy array where ChromaDB accepts one
+        
+        Older ChromaDB releases only validate lists of Python floats. The first call
+        that is rejected with an array is retried with lists, and if that succeeds
+        lists are used from then on.
+        """
+        
+        if self._numpy_embeddings:
+            try:
+                return method(**{keyword: embeddings}, **kwargs)
+            except (ValueError, TypeError):
+                result = method(**{keyword: embeddings.tolist()}, **kwargs)
+                self._numpy_embeddings = False
+                self.logger.info("ChromaDB does not accept NumPy embeddings; sending lists")
+                return result
+        
+        return method(**{keyword: embeddings.tolist()}, **kwargs)
+    
     def similarity_search(self, 
                          query: str, 
                          n_results: int = 5,
                          document_types: List[str] = None,
-                         min_similarity: float = 0.0) -> List[Dict[str, Any]]:
+                         min_similarity: float = MIN_COSINE_SIMILARITY) -> List[Dict[str, Any]]:
 
         try:
+            return self.similarity_search_batch([query], n_results, document_types, min_similarity)[0]
             
-            query_embedding = self.embedding_manager.generate_query_embedding(query)
+        except Exception as e:
+            self.logger.error(f"Error performing similarity search: {str(e)}")
+            raise
+    
+    def similarity_search_batch(self,
+                                queries: List[str],
+                                n_results: int = 5,
+                                document_types: List[str] = None,
+                                min_similarity: float = MIN_COSINE_SIMILARITY) -> List[List[Dict[str, Any]]]:
+        """
+        Run several similarity searches with one embedding call and one ChromaDB query
+        
+        Repeated query strings are embedded and searched once; each repeat receives
+        its own copies of the result dicts so callers can annotate them independently.
+        """
+        
+        if not queries:
+            return []
+        
+        unique_queries = list(dict.fromkeys(queries))
+        if len(unique_queries) < len(queries):
+            unique_results = dict(zip(
+                unique_queries,
+                self.similarity_search_batch(unique_queries, n_results, document_types, min_similarity)
+            ))
+            
+            batch_results = []
+            seen_queries = set()
+            for query in queries:
+                results = unique_results[query]
+                if query in seen_queries:
+                    results = [dict(result) for result in results]
+                seen_queries.add(query)
+                batch_results.append(results)
+            
+            return batch_results
+        
+        try:
+            
+            query_embeddings = self.embedding_manager.generate_query_embeddings(queries)
             
             
             where_conditions = {}
             if document_types:
                 where_conditions["document_type"] = {"$in": document_types}
             
-            
-            results = self.collection.query(
-                query_embeddings=[query_embedding.tolist()],
-                n_results=n_results,
-                where=where_conditions if where_conditions else None
-            )
-            
-            
-            search_results = []
-            if results['documents'] and results['documents'][0]:
-                for i, (doc, metadata, distance) in enumerate(zip(
-                    results['documents'][0],
-                    results['metadatas'][0],
-                    results['distances'][0]
-                )):
-                    
-                    # ChromaDB returns squared euclidean distance, convert to similarity
-                    # For normalized embeddings, cosine similarity = 1 - (euclidean_distance^2 / 2)
-                    # But for simplicity, we'll use inverse distance as similarity
-                    similarity = 1 / (1 + distance) if distance >= 0 else 0.0
-                    
-                    if similarity >= min_similarity:
-                        result = {
-                            'content': doc,
-                            'metadata': metadata,
-                            'similarity': similarity,
-                            'rank': i + 1
-                        }
-                        search_results.append(result)
-            
-            self.logger.info(f"Found {len(search_results)} relevant documents for query")
-            return search_results
+            search_key = (n_results, tuple(document_types or ()), min_similarity)
+            batch_results = [
+                self._cached_search(query, embedding, search_key)
+                for query, embedding in zip(queries, query_embeddings)
+            ]
+            misses = [index for index, results in enumerate(batch_results) if results is None]
+            
+            if misses:
+                results = self._with_embeddings(
+                    self.collection.query,
+                    "query_embeddings",
+                    query_embeddings[misses],
+                    n_results=n_results,
+                    where=where_conditions if where_conditions else None
+                )
+                
+                for result_index, query_index in enumerate(misses):
+                    search_results = self._build_search_results(
+                        results['documents'][result_index] if results['documents'] else [],
+                        results['metadatas'][result_index],
+                        results['distances'][result_index],
+                        min_similarity
+                    )
+                    self._remember_search(queries[query_index], query_embeddings[query_index], search_key, search_results)
+                    batch_results[query_index] = search_results
+            
+            self.logger.info(f"Found {sum(len(r) for r in batch_results)} relevant documents for {len(queries)} queries")
+            return batch_results
             
         except Exception as e:
-            self.logger.error(f"Error performing similarity search: {str(e)}")
+            self.logger.error(f"Error performing batch similarity search: {str(e)}")
             raise
     
+    def _build_search_results(self,
+                              documents: List[str],
+                              metadatas: List[Dict[str, Any]],
+                              distances: List[float],
+                              min_similarity: float) -> List[Dict[str, Any]]:
+        """Result dicts for one query's hits at or above min_similarity"""
+        
+        search_results = []
+        similarities = self._distances_to_similarities(distances[:len(documents)])
+        
+        # Only hits above the threshold get result dicts built for them
+        for i in np.flatnonzero(similarities >= min_similarity).tolist():
+            doc = documents[i]
+            metadata = metadatas[i]
+            
+            search_results.append({
+                'content': doc,
+                'metadata': metadata,
+                'similarity': float(similarities[i]),
+                'rank': i + 1,
+                # Derived once here instead of at every downstream filter and dedup site
+                '_content_upper': doc.upper(),
+                '_content_key': hashlib.blake2b(doc.encode('utf-8'), digest_size=16).digest(),
+                # Stored at ingestion; collections indexed before that fall back to slicing
+                '_content_preview': metadata.get('preview') or doc[:POLICY_PREVIEW_CHARS]
+            })
+        
+        return search_results
+    
+    def _cached_search(self, query: str, embedding: np.ndarray, search_key: Tuple) -> Optional[List[Dict[str, Any]]]:
+        """
+        Results of a recent search whose query embedding is nearly identical
+        
+        Only searches with the same parameters and the same band labels in the query
+        text are candidates, since band-specific queries differ by a single token.
+        Callers re-rank results in place, so copies are returned.
+        """
+        if not settings.search_cache_enabled:
+            return None
+        
+        bands = frozenset(_BAND_TOKEN_RE.findall(query.lower()))
+        with self._search_cache_lock:
+            candidates = [
+                key for key, entry in self._search_cache.items()
+                if key[0] == search_key and entry[0] == bands
+            ]
+            if not candidates:
+                return None
+            
+            scores = np.stack([self._search_cache[key][1] for key in candidates]) @ embedding
+            best = int(np.argmax(scores))
+            if scores[best] < settings.search_cache_threshold:
+                return None
+            
+            self._search_cache.move_to_end(candidates[best])
+            return [dict(result) for result in self._search_cache[candidates[best]][2]]
+    
+    def _remember_search(self, query: str, embedding: np.ndarray, search_key: Tuple, results: List[Dict[str, Any]]):
+        """Keep a copy of fresh search results for near-duplicate queries"""
+        if not settings.search_cache_enabled:
+            return
+        
+        bands = frozenset(_BAND_TOKEN_RE.findall(query.lower()))
+        with self._search_cache_lock:
+            self._search_cache[(search_key, query)] = (bands, embedding.copy(), [dict(result) for result in results])
+            self._search_cache.move_to_end((search_key, query))
+            while len(self._search_cache) > SEARCH_CACHE_SIZE:
+                self._search_cache.popitem(last=False)
+    
+    def _invalidate_search_cache(self):
+        """Forget cached search results after the collection changes"""
+        with self._search_cache_lock:
+            self._search_cache.clear()
+    
     def band_specific_search(self, query: str, band: str, n_results: int = 10, 
-                           document_types: List[str] = None, min_similarity: float = 0.0) -> List[Dict[str, Any]]:
+                           document_types: List[str] = None, min_similarity: float = MIN_COSINE_SIMILARITY) -> List[Dict[str, Any]]:
         """Enhanced search that prioritizes content specific to a particular band"""
         try:
             
@@ -163,77 +541,90 @@ class VectorStore:
                 min_similarity=min_similarity
             )
             
-            band_specific = []
-            general_content = []
-            
-            for result in initial_results:
-                content = result['content'].upper()
-                
-                if band.upper() in content:
-                    band_context_score = self._calculate_band_context_score(result['content'], band)
-                    result['band_context_score'] = band_context_score
-                    
-                    if band_context_score > 0.3:  
-                        result['similarity'] += 0.4
-                        result['band_specific'] = True
-                        result['priority'] = 'high'
-                        band_specific.append(result)
-                    else:
-                        result['similarity'] += 0.2
-                        result['band_specific'] = True  
-                        result['priority'] = 'medium'
-                        band_specific.append(result)
-                else:
-                    result['band_specific'] = False
-                    result['priority'] = 'low'
-                    general_content.append(result)
+            return self._rank_band_results(initial_results, band, n_results)
             
-            final_results = band_specific + general_content
+        except Exception as e:
+            self.logger.error(f"Error performing band-specific search: {str(e)}")
+            return self.similarity_search(query, n_results, document_types, min_similarity)
+    
+    def band_specific_search_batch(self, queries: List[str], band: str, n_results: int = 10,
+                                   document_types: List[str] = None, min_similarity: float = MIN_COSINE_SIMILARITY) -> List[List[Dict[str, Any]]]:
+        """band_specific_search for several queries, sharing one embedding call and one ChromaDB query"""
+        try:
             
-            final_results.sort(key=lambda x: x['similarity'], reverse=True)
+            initial_results = self.similarity_search_batch(
+                queries=queries,
+                n_results=n_results * 2,
+                document_types=document_types,
+                min_similarity=min_similarity
+            )
             
-            return final_results[:n_results]
+            return [self._rank_band_results(results, band, n_results) for results in initial_results]
             
         except Exception as e:
-            self.logger.error(f"Error performing band-specific search: {str(e)}")
-            return self.similarity_search(query, n_results, document_types, min_similarity)
+            self.logger.error(f"Error performing batch band-specific search: {str(e)}")
+            return self.similarity_search_batch(queries, n_results, document_types, min_similarity)
     
-    def _calculate_band_context_score(self, content: str, band: str) -> float:
-        """Calculate how contextually relevant content is to a specific band"""
-        content_lower = content.lower()
-        band_lower = band.lower()
-        score = 0.0
-        
-        band_patterns = [
-            f"{band_lower} employees",
-            f"{band_lower} band",
-            f"for {band_lower}",
-            f"{band_lower} level",
-            f"{band_lower} staff",
-            f"{band_lower}:",
-            f"level {band_lower}",
-            f"band {band_lower}"
-        ]
-        
-        for pattern in band_patterns:
-            if pattern in content_lower:
-                score += 0.3
+    def _rank_band_results(self, initial_results: List[Dict[str, Any]], band: str, n_results: int) -> List[Dict[str, Any]]:
+        """Boost results that mention the band and return the top n_results"""
         
-        table_patterns = [
-            "matrix", "table", "entitlement", "policy summary"
-        ]
+        band_specific = []
+        general_content = []
         
-        for pattern in table_patterns:
-            if pattern in content_lower and band_lower in content_lower:
-                score += 0.1
+        band_upper = band.upper()
+        tagged_band = band_upper in BAND_LABELS
         
-        other_bands = [f"l{i}" for i in range(1, 6) if f"l{i}" != band_lower]
-        other_band_mentions = sum(1 for band_ref in other_bands if band_ref in content_lower)
+        for result in initial_results:
+            metadata = result.get('metadata') or {}
+            if tagged_band and metadata.get('band_tagged'):
+                # Scored at ingestion; the score is only stored for bands the chunk mentions
+                band_context_score = metadata.get(f"band_score_{band_upper}")
+                mentions_band = band_context_score is not None
+            else:
+                mentions_band = band_upper in result['_content_upper']
+                band_context_score = self._calculate_band_context_score(result['content'], band) if mentions_band else None
+            
+            if mentions_band:
+                result['band_context_score'] = band_context_score
+                
+                if band_context_score > 0.3:  
+                    result['similarity'] += 0.4
+                    result['band_specific'] = True
+                    result['priority'] = 'high'
+                    band_specific.append(result)
+                else:
+                    result['similarity'] += 0.2
+                    result['band_specific'] = True  
+                    result['priority'] = 'medium'
+                    band_specific.append(result)
+            else:
+                result['band_specific'] = False
+                result['priority'] = 'low'
+                general_content.append(result)
+        
+        final_results = band_specific + general_content
         
-        if other_band_mentions > 2:
-            score *= 0.5  
+        final_results.sort(key=lambda x: x['similarity'], reverse=True)
+        
+        return final_results[:n_results]
+    
+    def _band_metadata(self, content: str) -> Dict[str, Any]:
+        """
+        Band context scores computed once at ingestion, for the bands a chunk mentions
         
-        return min(score, 1.0)  
+        Chroma metadata values must be scalars, so each band gets its own key;
+        band_tagged marks chunks indexed with these fields.
+        """
+        content_upper = content.upper()
+        tags = {"band_tagged": True}
+        for band in BAND_LABELS:
+            if band in content_upper:
+                tags[f"band_score_{band}"] = self._calculate_band_context_score(content, band)
+        return tags
+    
+    def _calculate_band_context_score(self, content: str, band: str) -> float:
+        """Calculate how contextually relevant content is to a specific band"""
+        return _band_context_score(content, band.lower())
     
     def get_documents_by_type(self, document_type: str, limit: int = None) -> List[Dict[str, Any]]:
         
@@ -258,43 +649,61 @@ class VectorStore:
             self.logger.error(f"Error retrieving documents by type: {str(e)}")
             raise
     
-    def get_relevant_policies(self, employee_context: Dict) -> Dict[str, List[Dict]]:
+    def get_relevant_policies(self, employee_context: Dict) -> RelevantPolicies:
+        
+        return self.get_relevant_policies_batch([employee_context])[0]
+    
+    def get_relevant_policies_batch(self, employee_contexts: List[Dict]) -> List[RelevantPolicies]:
+        """
+        get_relevant_policies for several employees with one embedding call and one ChromaDB query
+        
+        Retrieval depends only on the salary band, so each distinct band is searched once
+        and employees in the same band share the result.
+        """
+        
+        if not employee_contexts:
+            return []
         
         try:
-            employee = employee_context['employee']
-            salary_band = employee.get('salary_band', 'L1')
-            position = employee.get('position', '').lower()
-            
-            # Enhanced queries using the improved band-specific search
-            policy_queries = {
-                'leave_policy': f"leave entitlement {salary_band} earned leave sick leave casual leave matrix",
-                'travel_policy': f"travel allowance per diem {salary_band} flight hotel reimbursement matrix", 
-                'work_arrangements': f"work from home WFH WFO {salary_band} remote work flexible eligibility",
-                'infrastructure_support': f"WFH setup grant internet stipend laptop device policy {salary_band}"
-            }
-            
-            relevant_policies = {}
+            bands = [context['employee'].get('salary_band', 'L1') for context in employee_contexts]
+            unique_bands = list(dict.fromkeys(bands))
+            
+            queries = []
+            for salary_band in unique_bands:
+                # Enhanced queries using the improved band-specific search
+                queries.extend([
+                    f"leave entitlement {salary_band} earned leave sick leave casual leave matrix",
+                    f"travel allowance per diem {salary_band} flight hotel reimbursement matrix",
+                    f"work from home WFH WFO {salary_band} remote work flexible eligibility",
+                    f"WFH setup grant internet stipend laptop device policy {salary_band}"
+                ])
+            
+            n_results = 4  # Get more results for offer letters
+            search_results = self.similarity_search_batch(
+                queries=queries,
+                n_results=n_results * 2,
+                document_types=['hr_policy', 'travel_policy'],
+                min_similarity=MIN_COSINE_SIMILARITY
+            )
             
-            for policy_type, query in policy_queries.items():
+            policies_by_band = {}
+            for band_index, salary_band in enumerate(unique_bands):
+                band_results = search_results[band_index * len(POLICY_QUERY_TYPES):(band_index + 1) * len(POLICY_QUERY_TYPES)]
                 
-                # Use the enhanced band-specific search for better results
-                results = self.band_specific_search(
-                    query=query,
-                    band=salary_band,
-                    n_results=4,  # Get more results for offer letters
-                    document_types=['hr_policy', 'travel_policy'],
-                    min_similarity=0.05
-                )
+                relevant_policies = {}
+                for policy_type, results in zip(POLICY_QUERY_TYPES, band_results):
+                    results = self._rank_band_results(results, salary_band, n_results)
+                    if results:
+                        relevant_policies[policy_type] = results
+                        self.logger.info(f"Found {len(results)} relevant {policy_type} documents for {salary_band}")
                 
-                if results:
-                    relevant_policies[policy_type] = results
-                    self.logger.info(f"Found {len(results)} relevant {policy_type} documents for {salary_band}")
+                policies_by_band[salary_band] = RelevantPolicies(relevant_policies)
             
-            return relevant_policies
+            return [policies_by_band[salary_band] for salary_band in bands]
             
         except Exception as e:
             self.logger.error(f"Error retrieving relevant policies: {str(e)}")
-            return {}
+            return [RelevantPolicies() for _ in employee_contexts]
     
     def clear_collection(self):
         
@@ -303,8 +712,11 @@ class VectorStore:
             self.client.delete_collection(self.collection_name)
             self.collection = self.client.create_collection(
                 name=self.collection_name,
-                metadata={"description": "FenmoAI HR documents and policies"}
+                metadata=self._collection_metadata()
             )
+            self._distance_space = self._collection_distance_space()
+            self._doc_type_counts = None
+            self._invalidate_search_cache()
             self.logger.info("Collection cleared successfully")
         except Exception as e:
             self.logger.error(f"Error clearing collection: {str(e)}")
@@ -315,12 +727,20 @@ class VectorStore:
         try:
             count = self.collection.count()
             
-            all_docs = self.collection.get()
-            doc_types = {}
-            if all_docs['metadatas']:
-                for metadata in all_docs['metadatas']:
-                    doc_type = metadata.get('document_type', 'unknown')
-                    doc_types[doc_type] = doc_types.get(doc_type, 0) + 1
+            # Counting types means scanning every metadata record, so reuse the last
+            # tally while the collection size is unchanged
+            if self._doc_type_counts is not None and self._doc_type_counts[0] == count:
+                doc_types = dict(self._doc_type_counts[1])
+            else:
+                # Paged so only one page of metadata records is held at a time
+                type_counter = Counter()
+                for offset in range(0, count, STATS_PAGE_SIZE):
+                    page = self.collection.get(include=["metadatas"], limit=STATS_PAGE_SIZE, offset=offset)
+                    type_counter.update(
+                        metadata.get('document_type', 'unknown') for metadata in page['metadatas'] or ()
+                    )
+                doc_types = dict(type_counter)
+                self._doc_type_counts = (count, dict(doc_types))
             
             stats = {
                 'total_documents': count,
@@ -338,13 +758,16 @@ class VectorStore:
     def delete_by_source(self, source_document: str):
         
         try:
-            results = self.collection.get(
-                where={"source_document": source_document}
-            )
-            
-            if results['ids']:
-                self.collection.delete(ids=results['ids'])
-                self.logger.info(f"Deleted {len(results['ids'])} chunks from {source_document}")
+            # Deleting by filter saves fetching the ids first; the count comes from the
+            # collection size before and after
+            count_before = self.collection.count()
+            self.collection.delete(where={"source_document": source_document})
+            deleted_count = count_before - self.collection.count()
+            
+            if deleted_count:
+                self._doc_type_counts = None
+                self._invalidate_search_cache()
+                self.logger.info(f"Deleted {deleted_count} chunks from {source_document}")
             else:
                 self.logger.info(f"No documents found for source: {source_document}")
                 
@@ -23,10 +23,16 @@ sys.path.insert(0, str(project_root))
 # Load environment
 load_dotenv()
 
-# Import RAG components
-from src.agent import RAGEngine
-from src.data import EmployeeManager
-from src.utils.document_generator import DocumentGenerator
+# RAG components are imported where first used: importing the src package pulls in
+# chromadb and sentence-transformers, and the page should render before that happens
+
+# Requests for offer letters or employee info: generate/create/offer letter/show information/
+# info/details ... for <name>. The greedy .* takes the last "for" on the line, so one
+# alternation finds the same name as trying the phrasings one by one
+_EMPLOYEE_NAME_RE = re.compile(
+    r"(?:generate|create|offer.*letter|info|details).*for\s+([a-zA-Z\s]+)",
+    re.IGNORECASE
+)
 
 # Configure page
 st.set_page_config(
@@ -43,18 +49,47 @@ if "rag_engine" not in st.session_state:
 if "system_initialized" not in st.session_state:
     st.session_state.system_initialized = False
 
+@st.cache_data(ttl=30, show_spinner=False)
+def cached_system_status(_rag_engine):
+    """System status shared across reruns; refreshed at most every 30 seconds"""
+    return _rag_engine.get_system_status()
+
+@st.cache_data(ttl=300, show_spinner=False)
+def cached_employee_names(_employee_manager):
+    """
+    (lookup name, display name) for every employee, refreshed at most every 5 minutes
+    
+    The manager is left out of the cache key, so initialize_system clears this
+    whenever it builds a new engine and reloads employee data.
+    """
+    return [
+        (emp_name, _employee_manager.find_employee(emp_name).name)
+        for emp_name in _employee_manager.list_all_employees()
+    ]
+
+@st.cache_resource
+def get_document_generator():
+    """Single DocumentGenerator reused by every download button"""
+    from src.utils.document_generator import DocumentGenerator
+    return DocumentGenerator()
+
 def initialize_system():
     """Initialize the RAG system"""
     try:
         with st.spinner("🚀 Initializing FenmoAI System..."):
             # Initialize full RAG engine
             try:
+                from src.agent import RAGEngine
                 rag_engine = RAGEngine()
             except Exception as e:
                 st.error(f"❌ Failed to initialize system: {str(e)}")
                 st.info("Please check your configuration and try refreshing the page.")
                 return False
             
+            # Cached results are keyed without the engine, so drop those of any previous one
+            cached_system_status.clear()
+            cached_employee_names.clear()
+            
             # Test Gemini availability for offer letter generation
             try:
                 gemini_available = rag_engine.gemini_client.test_connection()
@@ -66,7 +101,7 @@ def initialize_system():
                 st.info("🔍 **Policy search is fully functional!**")
             
             # Check system status
-            status = rag_engine.get_system_status()
+            status = cached_system_status(rag_engine)
             
             # Process documents if needed
             if status['vector_store']['total_documents'] == 0:
@@ -76,6 +111,8 @@ def initialize_system():
                         st.error(f"Document processing errors: {processing_result['errors']}")
                     else:
                         st.success(f"✅ Processed {processing_result['total_chunks']} document chunks")
+                    cached_system_status.clear()
+                    status = cached_system_status(rag_engine)
             
             st.session_state.rag_engine = rag_engine
             st.session_state.gemini_available = gemini_available
@@ -134,7 +171,7 @@ def initialize_system():
 
 def create_download_buttons(offer_letter_text: str, employee_name: str, key_prefix: str):
     """Create download buttons for different file formats"""
-    doc_generator = DocumentGenerator()
+    doc_generator = get_document_generator()
     available_formats = doc_generator.get_available_formats()
     
     # Create columns for different download options
@@ -188,30 +225,81 @@ def create_download_buttons(offer_letter_text: str, employee_name: str, key_pref
 
 def extract_employee_name(user_input):
     """Extract employee name from user input"""
-    # Common patterns for requesting offer letters or employee info
-    patterns = [
-        r"generate.*offer.*letter.*for\s+([a-zA-Z\s]+)",
-        r"create.*offer.*letter.*for\s+([a-zA-Z\s]+)", 
-        r"offer.*letter.*for\s+([a-zA-Z\s]+)",
-        r"generate.*for\s+([a-zA-Z\s]+)",
-        r"create.*for\s+([a-zA-Z\s]+)",
-        r"show.*information.*for\s+([a-zA-Z\s]+)",
-        r"info.*for\s+([a-zA-Z\s]+)",
-        r"details.*for\s+([a-zA-Z\s]+)"
-    ]
-    
     user_input_lower = user_input.lower()
     
-    for pattern in patterns:
-        match = re.search(pattern, user_input_lower, re.IGNORECASE)
-        if match:
-            name = match.group(1).strip()
-            # Clean up the name
-            name = ' '.join(word.capitalize() for word in name.split())
-            return name
+    # Every request pattern ends in "for <name>"
+    if 'for' not in user_input_lower:
+        return None
+    
+    match = _EMPLOYEE_NAME_RE.search(user_input_lower)
+    if match:
+        name = match.group(1).strip()
+        # Clean up the name
+        name = ' '.join(word.capitalize() for word in name.split())
+        return name
     
     return None
 
+def format_offer_letter_response(result):
+    """Build the chat message for a generated offer letter"""
+    employee_info = result['employee_context']['employee']
+    metadata = result['generation_metadata']
+    
+    response = f"""✅ **Offer Letter Generated for {employee_info['name']}**
+
+👤 **Employee Details:**
+- **Position:** {employee_info['position']}
+- **Department:** {employee_info['department']}
+- **Salary Band:** {employee_info['salary_band']}
+- **Base Salary:** ₹{employee_info['base_salary']:,}
+
+📋 **Generation Summary:**
+- **Policies Used:** {metadata['policies_used']} policy types
+- **Policy Chunks:** {metadata['total_policy_chunks']} relevant sections
+
+---
+
+📄 **OFFER LETTER:**
+
+{result['offer_letter']}
+
+---
+
+💾 **Download:** Use the download button below to save this offer letter."""
+    
+    return {
+        "content": response,
+        "offer_letter": result['offer_letter'],
+        "employee_name": employee_info['name'],
+        "metadata": result
+    }
+
+def offer_letter_error_response(employee_name, error):
+    """Build the chat message for a failed offer letter generation"""
+    return {
+        "content": f"❌ **Error generating offer letter for {employee_name}:**\n\n{str(error)}\n\n**Suggestions:**\n- Check if the employee name is spelled correctly\n- Try: 'Generate offer letter for Martha Bennett'"
+    }
+
+def stream_offer_letter(employee_name):
+    """Render an offer letter into the current chat message as Gemini generates it"""
+    rag_engine = st.session_state.rag_engine
+    
+    try:
+        with st.spinner(f"🔍 Preparing offer letter for {employee_name}..."):
+            stream = rag_engine.generate_offer_letter_stream(employee_name)
+        
+        placeholder = st.empty()
+        with placeholder.container():
+            st.markdown(f"📄 **Offer letter for {stream.employee_context['employee']['name']}:**")
+            st.write_stream(stream)
+        
+        # Replace the raw stream with the full formatted message once complete
+        placeholder.empty()
+        return format_offer_letter_response(stream.result)
+        
+    except Exception as e:
+        return offer_letter_error_response(employee_name, e)
+
 def handle_user_query(query):
     """Handle user query and generate response"""
     try:
@@ -256,53 +344,17 @@ def handle_user_query(query):
                 with st.spinner(f"🔍 Generating offer letter for {employee_name}..."):
                     try:
                         result = rag_engine.generate_offer_letter(employee_name)
-                        
-                        # Format response
-                        employee_info = result['employee_context']['employee']
-                        metadata = result['generation_metadata']
-                        
-                        response = f"""✅ **Offer Letter Generated for {employee_info['name']}**
-
-👤 **Employee Details:**
-- **Position:** {employee_info['position']}
-- **Department:** {employee_info['department']}
-- **Salary Band:** {employee_info['salary_band']}
-- **Base Salary:** ₹{employee_info['base_salary']:,}
-
-📋 **Generation Summary:**
-- **Policies Used:** {metadata['policies_used']} policy types
-- **Policy Chunks:** {metadata['total_policy_chunks']} relevant sections
-
----
-
-📄 **OFFER LETTER:**
-
-{result['offer_letter']}
-
----
-
-💾 **Download:** Use the download button below to save this offer letter."""
-                        
-                        return {
-                            "content": response,
-                            "offer_letter": result['offer_letter'],
-                            "employee_name": employee_info['name'],
-                            "metadata": result
-                        }
+                        return format_offer_letter_response(result)
                         
                     except Exception as e:
-                        return {
-                            "content": f"❌ **Error generating offer letter for {employee_name}:**\n\n{str(e)}\n\n**Suggestions:**\n- Check if the employee name is spelled correctly\n- Try: 'Generate offer letter for Martha Bennett'"
-                        }
+                        return offer_letter_error_response(employee_name, e)
         else:
             # Handle general queries (policy search)
             with st.spinner("🔍 Searching policies..."):
                 search_results = rag_engine.search_policies(query)
                 
-                # Use the new response formatter
-                from src.utils import ResponseFormatter
-                formatter = ResponseFormatter()
-                response = formatter.format_policy_search_results(query, search_results)
+                # Reuse the engine's response formatter rather than building one per query
+                response = rag_engine.response_formatter.format_policy_search_results(query, search_results)
                 
                 # Add note about offer letter availability if needed
                 if not gemini_available and search_results:
@@ -332,30 +384,29 @@ def main():
         st.header("📊 System Status")
         
         if st.session_state.rag_engine:
-            status = st.session_state.rag_engine.get_system_status()
+            status = cached_system_status(st.session_state.rag_engine)
             
             st.metric("📄 Documents", status['vector_store']['total_documents'])
             st.metric("👥 Employees", status['employee_count'])
             st.metric("🤖 Gemini Status", "✅ Connected" if status['gemini_connected'] else "❌ Error")
             
             st.header("👥 Available Employees")
-            employees = st.session_state.rag_engine.employee_manager.list_all_employees()
+            employees = cached_employee_names(st.session_state.rag_engine.employee_manager)
             
             # Employee list with expandable view
             gemini_available = st.session_state.get('gemini_available', False)
             
             # Show first 10 employees
-            for emp_name in employees[:10]:
-                employee = st.session_state.rag_engine.employee_manager.find_employee(emp_name)
-                button_text = f"📝 {employee.name}" if gemini_available else f"👤 {employee.name}"
+            for emp_name, display_name in employees[:10]:
+                button_text = f"📝 {display_name}" if gemini_available else f"👤 {display_name}"
                 
                 if st.button(button_text, key=f"btn_{emp_name}"):
                     if gemini_available:
                         # Auto-generate offer letter query
-                        query = f"Generate offer letter for {employee.name}"
+                        query = f"Generate offer letter for {display_name}"
                     else:
                         # Show employee info query
-                        query = f"Show information for {employee.name}"
+                        query = f"Show information for {display_name}"
                     
                     st.session_state.messages.append({"role": "user", "content": query})
                     
@@ -368,17 +419,16 @@ def main():
             if len(employees) > 10:
                 remaining_employees = employees[10:]
                 with st.expander(f"👥 Show {len(remaining_employees)} more employees"):
-                    for emp_name in remaining_employees:
-                        employee = st.session_state.rag_engine.employee_manager.find_employee(emp_name)
-                        button_text = f"📝 {employee.name}" if gemini_available else f"👤 {employee.name}"
+                    for emp_name, display_name in remaining_employees:
+                        button_text = f"📝 {display_name}" if gemini_available else f"👤 {display_name}"
                         
                         if st.button(button_text, key=f"btn_more_{emp_name}"):
                             if gemini_available:
                                 # Auto-generate offer letter query
-                                query = f"Generate offer letter for {employee.name}"
+                                query = f"Generate offer letter for {display_name}"
                             else:
                                 # Show employee info query
-                                query = f"Show information for {employee.name}"
+                                query = f"Show information for {display_name}"
                             
                             st.session_state.messages.append({"role": "user", "content": query})
                             
@@ -415,7 +465,12 @@ def main():
         
         # Generate and display assistant response
         with st.chat_message("assistant"):
-            response = handle_user_query(prompt)
+            employee_name = extract_employee_name(prompt) if st.session_state.get('gemini_available', False) else None
+            
+            if employee_name:
+                response = stream_offer_letter(employee_name)
+            else:
+                response = handle_user_query(prompt)
             st.markdown(response["content"])
             
             # Add download buttons if offer letter generated
@@ -0,0 +1,36 @@
+"""
+JSON serialization helpers using orjson when available
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _default(obj: Any) -> Any:
+    """Fallback encoding for values neither serializer handles natively"""
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.hex()
+    if hasattr(obj, 'tolist'):
+        # numpy arrays and scalars
+        return obj.tolist()
+    return str(obj)
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Serialize an object to UTF-8 encoded JSON bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+def loads(data) -> Any:
+    """Deserialize JSON from bytes or str"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
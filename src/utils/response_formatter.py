@@ -3,9 +3,200 @@ Response formatter for improving search result presentation
 """
 
 import re
+import functools
 from typing import List, Dict, Any
 from collections import defaultdict
 
+# Matrix detection and parsing depend only on (content, band); cached at module
+# level so every ResponseFormatter shares one cache without keeping instances alive
+
+@functools.lru_cache(maxsize=256)
+def _is_leave_matrix(content: str) -> bool:
+    """Check if content contains the leave entitlement matrix"""
+    content_lower = content.lower()
+    
+
+    matrix_indicators = [
+        ('total leave', 'earned'),
+        ('leave days', 'sick'),
+        ('casual', 'wfh eligibility'),
+        ('ban d', 'days'), 
+    ]
+    
+    return any(
+        indicator1 in content_lower and indicator2 in content_lower 
+        for indicator1, indicator2 in matrix_indicators
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_leave_entitlement_matrix(content: str, band: str) -> str:
+    """Parse the leave entitlement matrix to extract specific band details"""
+    
+    lines = content.split('\n')
+    
+
+    if band == 'L5':
+        for i, line in enumerate(lines):
+            if 'L5' in line and 'unlimited' in line.lower():
+
+                l5_content = line
+                if i + 1 < len(lines) and 'approval' in lines[i + 1]:
+                    l5_content += ' ' + lines[i + 1].strip()
+                
+
+                wfh_eligibility = "Full Flex"
+                wfo_match = re.search(r'(\d+[-–]\d+)\s*/?\s*week', l5_content, re.IGNORECASE)
+                wfo_minimum = wfo_match.group(1) + "/week (optional)" if wfo_match else "0–2/week (optional)"
+                
+                return f"""**🎯 {band} Leave Entitlement Breakdown:**
+
+📊 **Leave Days Allocation:**
+• **Total Annual Leave:** Unlimited (with approval)
+• **Earned Leave (EL):** Not applicable
+• **Sick Leave (SL):** Not applicable  
+• **Casual Leave (CL):** Not applicable
+
+🏠 **Work Arrangements:**
+• **WFH Eligibility:** {wfh_eligibility}
+• **WFO Minimum:** {wfo_minimum}
+
+💡 **Key Points:**
+• Executive level employees have unlimited leave with management approval
+• Maximum flexibility in work arrangements
+• Full remote work options available
+• Leave resets annually on January 1st"""
+    
+
+    for line in lines:
+        if band in line.upper():
+            
+            band_split = line.upper().split(band.upper())
+            if len(band_split) > 1:
+                numbers_part = band_split[1]
+                
+                leave_numbers = re.findall(r'\d+', numbers_part.split('Yes')[0].split('Limited')[0].split('Partial')[0])
+                
+
+                if len(leave_numbers) >= 4:
+                    try:
+                        total_days = int(leave_numbers[0])
+                        earned_leave = int(leave_numbers[1]) 
+                        sick_leave = int(leave_numbers[2])
+                        casual_leave = int(leave_numbers[3])
+                        
+
+                        if "yes" in line.lower():
+                            wfh_eligibility = "Yes (Full WFH available)"
+                        elif "partial" in line.lower():
+                            wfh_eligibility = "Partial (Hybrid work)"
+                        elif "limited" in line.lower():
+                            wfh_eligibility = "Limited"
+                        else:
+                            wfh_eligibility = "Unknown"
+                        
+
+                        wfo_match = re.search(r'(\d+(?:[-–]\d+)?)\s*/?\s*week', line, re.IGNORECASE)
+                        wfo_minimum = wfo_match.group(1) + "/week" if wfo_match else "Not specified"
+                        
+                        return f"""**🎯 {band} Leave Entitlement Breakdown:**
+
+📊 **Leave Days Allocation:**
+• **Total Annual Leave:** {total_days} days
+• **Earned Leave (EL):** {earned_leave} days  
+• **Sick Leave (SL):** {sick_leave} days
+• **Casual Leave (CL):** {casual_leave} days
+
+🏠 **Work Arrangements:**
+• **WFH Eligibility:** {wfh_eligibility}
+• **WFO Minimum:** {wfo_minimum}
+
+💡 **Key Points:**
+• Earned Leave: For planned personal time, travel, rest (apply ≥3 days in advance)
+• Sick Leave: For illness/medical emergencies (no prior approval needed)
+• Casual Leave: For unforeseen situations (max 2 consecutive days)
+• Leave resets annually on January 1st
+• Unused leave can be carried forward (max 10 days)"""
+                        
+                    except (ValueError, IndexError):
+                        continue
+    
+
+    for i, line in enumerate(lines):
+        if band in line.upper() and any(char.isdigit() for char in line):
+            context_lines = []
+            
+
+            if i > 0:
+                prev_line = lines[i-1].strip()
+                if any(term in prev_line.lower() for term in ['band', 'total', 'leave', 'days']):
+                    context_lines.append(f"*{prev_line}*")
+            
+            context_lines.append(f"**{band}:** {line.strip()}")
+            
+            return f"**{band} Information:**\n" + '\n'.join(context_lines)
+    
+    return ""
+
+
+@functools.lru_cache(maxsize=256)
+def _is_travel_matrix(content: str) -> bool:
+    """Check if content contains the travel entitlement matrix"""
+    content_lower = content.lower()
+    
+    travel_indicators = [
+        ('travel', 'per diem'),
+        ('hotel', 'flight'),
+        ('domestic', 'international'),
+        ('travel mode', 'approval'),
+        ('per diem', 'hotel cap'),
+        ('flight class', 'eligibility'),
+        ('travel band', 'matrix'),
+        ('allowance', 'reimbursement'),
+        ('business', 'economy'),
+        ('rs.', 'usd'),
+        ('cap/night', 'approval required')
+    ]
+    
+    return any(
+        indicator1 in content_lower and indicator2 in content_lower 
+        for indicator1, indicator2 in travel_indicators
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_travel_entitlement_matrix(content: str, band: str) -> str:
+    """Parse the travel entitlement matrix to extract specific band details from actual document content"""
+    
+    lines = content.split('\n')
+    
+    band_line = None
+    for line in lines:
+        if band in line.upper() and any(char.isdigit() for char in line):
+            band_line = line
+            break
+    
+    if not band_line:
+        for i, line in enumerate(lines):
+            if band in line.upper():
+                context_lines = []
+                
+                if i > 0:
+                    prev_line = lines[i-1].strip()
+                    if any(term in prev_line.lower() for term in ['band', 'travel', 'mode', 'cap']):
+                        context_lines.append(f"*{prev_line}*")
+                
+                context_lines.append(f"**{band}:** {line.strip()}")
+                return f"**{band} Travel Information:**\n" + '\n'.join(context_lines)
+        return ""
+    
+    travel_data = ResponseFormatter._extract_travel_data_from_band_line(band_line, band, content)
+    
+    if travel_data:
+        return ResponseFormatter._format_travel_breakdown_from_data(band, travel_data)
+    
+    return f"**🎯 {band} Travel Policy:**\n\n{band_line.strip()}"
+
 class ResponseFormatter:
     """Formats search results into user-friendly responses"""
     
@@ -348,195 +539,28 @@ class ResponseFormatter:
     
     def _is_leave_matrix(self, content: str) -> bool:
         """Check if content contains the leave entitlement matrix"""
-        content_lower = content.lower()
-        
-
-        matrix_indicators = [
-            ('total leave', 'earned'),
-            ('leave days', 'sick'),
-            ('casual', 'wfh eligibility'),
-            ('ban d', 'days'), 
-        ]
-        
-        return any(
-            indicator1 in content_lower and indicator2 in content_lower 
-            for indicator1, indicator2 in matrix_indicators
-        )
+        return _is_leave_matrix(content)
     
     def _parse_leave_entitlement_matrix(self, content: str, band: str) -> str:
         """Parse the leave entitlement matrix to extract specific band details"""
-        import re
-        
-        lines = content.split('\n')
-        
-
-        if band == 'L5':
-            for i, line in enumerate(lines):
-                if 'L5' in line and 'unlimited' in line.lower():
-
-                    l5_content = line
-                    if i + 1 < len(lines) and 'approval' in lines[i + 1]:
-                        l5_content += ' ' + lines[i + 1].strip()
-                    
-
-                    wfh_eligibility = "Full Flex"
-                    wfo_match = re.search(r'(\d+[-–]\d+)\s*/?\s*week', l5_content, re.IGNORECASE)
-                    wfo_minimum = wfo_match.group(1) + "/week (optional)" if wfo_match else "0–2/week (optional)"
-                    
-                    return f"""**🎯 {band} Leave Entitlement Breakdown:**
-
-📊 **Leave Days Allocation:**
-• **Total Annual Leave:** Unlimited (with approval)
-• **Earned Leave (EL):** Not applicable
-• **Sick Leave (SL):** Not applicable  
-• **Casual Leave (CL):** Not applicable
-
-🏠 **Work Arrangements:**
-• **WFH Eligibility:** {wfh_eligibility}
-• **WFO Minimum:** {wfo_minimum}
-
-💡 **Key Points:**
-• Executive level employees have unlimited leave with management approval
-• Maximum flexibility in work arrangements
-• Full remote work options available
-• Leave resets annually on January 1st"""
-        
-
-        for line in lines:
-            line_clean = ' '.join(line.split())
-            
-            if band in line.upper():
-                
-                band_split = line.upper().split(band.upper())
-                if len(band_split) > 1:
-                    numbers_part = band_split[1]
-                    
-                    leave_numbers = re.findall(r'\d+', numbers_part.split('Yes')[0].split('Limited')[0].split('Partial')[0])
-                    
-
-                    if len(leave_numbers) >= 4:
-                        try:
-                            total_days = int(leave_numbers[0])
-                            earned_leave = int(leave_numbers[1]) 
-                            sick_leave = int(leave_numbers[2])
-                            casual_leave = int(leave_numbers[3])
-                            
-
-                            if "yes" in line.lower():
-                                wfh_eligibility = "Yes (Full WFH available)"
-                            elif "partial" in line.lower():
-                                wfh_eligibility = "Partial (Hybrid work)"
-                            elif "limited" in line.lower():
-                                wfh_eligibility = "Limited"
-                            else:
-                                wfh_eligibility = "Unknown"
-                            
-
-                            wfo_match = re.search(r'(\d+(?:[-–]\d+)?)\s*/?\s*week', line, re.IGNORECASE)
-                            wfo_minimum = wfo_match.group(1) + "/week" if wfo_match else "Not specified"
-                            
-                            return f"""**🎯 {band} Leave Entitlement Breakdown:**
-
-📊 **Leave Days Allocation:**
-• **Total Annual Leave:** {total_days} days
-• **Earned Leave (EL):** {earned_leave} days  
-• **Sick Leave (SL):** {sick_leave} days
-• **Casual Leave (CL):** {casual_leave} days
-
-🏠 **Work Arrangements:**
-• **WFH Eligibility:** {wfh_eligibility}
-• **WFO Minimum:** {wfo_minimum}
-
-💡 **Key Points:**
-• Earned Leave: For planned personal time, travel, rest (apply ≥3 days in advance)
-• Sick Leave: For illness/medical emergencies (no prior approval needed)
-• Casual Leave: For unforeseen situations (max 2 consecutive days)
-• Leave resets annually on January 1st
-• Unused leave can be carried forward (max 10 days)"""
-                            
-                        except (ValueError, IndexError):
-                            continue
-        
-
-        for i, line in enumerate(lines):
-            if band in line.upper() and any(char.isdigit() for char in line):
-                context_lines = []
-                
-
-                if i > 0:
-                    prev_line = lines[i-1].strip()
-                    if any(term in prev_line.lower() for term in ['band', 'total', 'leave', 'days']):
-                        context_lines.append(f"*{prev_line}*")
-                
-                context_lines.append(f"**{band}:** {line.strip()}")
-                
-                return f"**{band} Information:**\n" + '\n'.join(context_lines)
-        
-        return ""
+        return _parse_leave_entitlement_matrix(content, band)
     
     def _is_travel_matrix(self, content: str) -> bool:
         """Check if content contains the travel entitlement matrix"""
-        content_lower = content.lower()
-        
-        travel_indicators = [
-            ('travel', 'per diem'),
-            ('hotel', 'flight'),
-            ('domestic', 'international'),
-            ('travel mode', 'approval'),
-            ('per diem', 'hotel cap'),
-            ('flight class', 'eligibility'),
-            ('travel band', 'matrix'),
-            ('allowance', 'reimbursement'),
-            ('business', 'economy'),
-            ('rs.', 'usd'),
-            ('cap/night', 'approval required')
-        ]
-        
-        return any(
-            indicator1 in content_lower and indicator2 in content_lower 
-            for indicator1, indicator2 in travel_indicators
-        )
+        return _is_travel_matrix(content)
     
     def _parse_travel_entitlement_matrix(self, content: str, band: str) -> str:
         """Parse the travel entitlement matrix to extract specific band details from actual document content"""
-        import re
-        
-        lines = content.split('\n')
-        
-        band_line = None
-        for line in lines:
-            if band in line.upper() and any(char.isdigit() for char in line):
-                band_line = line
-                break
-        
-        if not band_line:
-            for i, line in enumerate(lines):
-                if band in line.upper():
-                    context_lines = []
-                    
-                    if i > 0:
-                        prev_line = lines[i-1].strip()
-                        if any(term in prev_line.lower() for term in ['band', 'travel', 'mode', 'cap']):
-                            context_lines.append(f"*{prev_line}*")
-                    
-                    context_lines.append(f"**{band}:** {line.strip()}")
-                    return f"**{band} Travel Information:**\n" + '\n'.join(context_lines)
-            return ""
-        
-        travel_data = self._extract_travel_data_from_band_line(band_line, band, content)
-        
-        if travel_data:
-            return self._format_travel_breakdown_from_data(band, travel_data)
-        
-        return f"**🎯 {band} Travel Policy:**\n\n{band_line.strip()}"
+        return _parse_travel_entitlement_matrix(content, band)
     
-    def _extract_travel_data_from_band_line(self, band_line: str, band: str, full_content: str) -> Dict[str, str]:
+    @staticmethod
+    def _extract_travel_data_from_band_line(band_line: str, band: str, full_content: str) -> Dict[str, str]:
         """Extract travel data by parsing the travel matrix structure systematically"""
         import re
         
         travel_data = {}
         
-        matrix_data = self._parse_travel_matrix_structure(full_content, band)
+        matrix_data = ResponseFormatter._parse_travel_matrix_structure(full_content, band)
         
         if matrix_data:
             return matrix_data
@@ -557,7 +581,8 @@ class ResponseFormatter:
         
         return travel_data
     
-    def _parse_travel_matrix_structure(self, content: str, band: str) -> Dict[str, str]:
+    @staticmethod
+    def _parse_travel_matrix_structure(content: str, band: str) -> Dict[str, str]:
         """Systematically parse the travel matrix to extract exact band data"""
         import re
         
@@ -697,7 +722,7 @@ class ResponseFormatter:
         if not header_line:
             return travel_data
         
-        header_columns = self._parse_matrix_columns(header_line)
+        header_columns = ResponseFormatter._parse_matrix_columns(header_line)
         
         band_line = None
         for i in range(header_index + 1, len(lines)):
@@ -708,7 +733,7 @@ class ResponseFormatter:
         if not band_line:
             return travel_data
         
-        band_values = self._parse_matrix_columns(band_line)
+        band_values = ResponseFormatter._parse_matrix_columns(band_line)
         
         for i, (header_col, band_val) in enumerate(zip(header_columns, band_values)):
             header_lower = header_col.lower()
@@ -730,7 +755,8 @@ class ResponseFormatter:
         
         return travel_data
     
-    def _parse_matrix_columns(self, line: str) -> List[str]:
+    @staticmethod
+    def _parse_matrix_columns(line: str) -> List[str]:
         """Parse a matrix line into columns, handling various separators"""
         import re
         
@@ -758,7 +784,8 @@ class ResponseFormatter:
         
         return [line.strip()] if line.strip() else []
     
-    def _format_travel_breakdown_from_data(self, band: str, travel_data: Dict[str, str]) -> str:
+    @staticmethod
+    def _format_travel_breakdown_from_data(band: str, travel_data: Dict[str, str]) -> str:
         """Format travel breakdown using extracted data from documents"""
         
         
@@ -0,0 +1,4 @@
+import os
+
+# Settings require an API key at import time; tests never reach the real API
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
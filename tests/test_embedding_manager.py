@@ -0,0 +1,79 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from src.embeddings import embedding_manager
+from src.embeddings.embedding_manager import EmbeddingManager
+
+
+class FakeModel:
+    """Deterministic unit vectors per text, counting encode calls"""
+    
+    def __init__(self):
+        self.encoded = []
+    
+    def encode(self, texts, **kwargs):
+        self.encoded.extend(texts)
+        vectors = np.array([[len(text), sum(map(ord, text)) % 97, 1.0] for text in texts], dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(EmbeddingManager, "_load_model", lambda self: setattr(self, "model", FakeModel()))
+    manager = EmbeddingManager(model_name="fake-model", cache_dir=str(tmp_path))
+    yield manager
+    # Nothing left for the exit hook to write into a removed temp directory
+    embedding_manager._LIVE_MANAGERS.discard(manager)
+
+
+def test_saved_embeddings_round_trip_at_full_precision(manager, tmp_path):
+    embeddings = np.random.default_rng(0).standard_normal((5, 8)).astype(np.float32)
+    
+    manager.save_embeddings(embeddings, "chunks")
+    loaded = manager.load_embeddings("chunks")
+    
+    assert loaded.dtype == np.float32
+    np.testing.assert_array_equal(loaded, embeddings)
+    assert sorted(path.name for path in tmp_path.glob("chunks.*")) == ["chunks.npy"]
+
+
+def test_legacy_pickles_still_load_and_are_replaced_on_save(manager, tmp_path):
+    embeddings = np.eye(3, dtype=np.float32)
+    with open(tmp_path / "chunks.pkl", "wb") as f:
+        pickle.dump(embeddings, f)
+    
+    np.testing.assert_array_equal(manager.load_embeddings("chunks"), embeddings)
+    
+    manager.save_embeddings(embeddings * 2, "chunks")
+    assert not (tmp_path / "chunks.pkl").exists()
+    np.testing.assert_array_equal(manager.load_embeddings("chunks"), embeddings * 2)
+
+
+def test_missing_embeddings_load_as_none(manager):
+    assert manager.load_embeddings("never_saved") is None
+
+
+def test_query_cache_is_flushed_every_interval_of_new_queries(manager):
+    interval = embedding_manager.QUERY_CACHE_FLUSH_INTERVAL
+    assert interval == 32
+    
+    manager.generate_query_embeddings([f"leave policy {index}" for index in range(interval - 1)])
+    assert not manager._query_cache_path().exists()
+    
+    manager.generate_query_embeddings(["leave policy", "leave policy 0"])
+    assert manager._query_cache_path().exists()
+    assert manager._unsaved_query_embeddings == 0
+
+
+def test_flushed_query_cache_warms_the_next_manager(manager, tmp_path):
+    queries = [f"travel allowance L{index}" for index in range(3)]
+    expected = manager.generate_query_embeddings(queries)
+    manager.flush_query_cache()
+    
+    restarted = EmbeddingManager(model_name="fake-model", cache_dir=str(tmp_path))
+    embedding_manager._LIVE_MANAGERS.discard(restarted)
+    
+    np.testing.assert_array_equal(restarted.generate_query_embeddings(queries), expected)
+    assert restarted.model.encoded == []
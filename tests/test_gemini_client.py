@@ -0,0 +1,199 @@
+import gzip
+import json
+from unittest import mock
+
+import pytest
+import requests
+
+from src.agent import gemini_client as gemini_client_module
+from src.agent.gemini_client import GZIP_MIN_REQUEST_BYTES, GeminiClient
+from src.agent.response_cache import OfferLetterCache
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, payload=None, text=None):
+        self.status_code = status_code
+        self.content = json.dumps(payload if payload is not None else {}).encode()
+        self.text = text if text is not None else self.content.decode()
+        self.closed = False
+    
+    def close(self):
+        self.closed = True
+
+
+def ok_response(text="Offer letter"):
+    return FakeResponse(200, {'candidates': [{'content': {'parts': [{'text': text}]}}]})
+
+
+def large_payload():
+    return {'contents': [{'parts': [{'text': "x" * (GZIP_MIN_REQUEST_BYTES * 2)}]}]}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    test_settings = gemini_client_module.settings.model_copy(update={
+        'offer_cache_enabled': False,
+        'gemini_context_cache_enabled': False,
+        'gemini_compress_requests': True,
+        'cache_dir': str(tmp_path),
+    })
+    monkeypatch.setattr(gemini_client_module, "settings", test_settings)
+    
+    client = GeminiClient()
+    client._session = mock.Mock(spec=requests.Session)
+    client._tier_session = mock.Mock(spec=requests.Session)
+    return client
+
+
+def sent_body(call):
+    """Decoded JSON body of a recorded session.post call"""
+    body = call.kwargs['data']
+    if call.kwargs.get('headers', {}).get('Content-Encoding') == 'gzip':
+        body = gzip.decompress(body)
+    return json.loads(body)
+
+
+def test_large_bodies_are_gzip_compressed(client):
+    client._session.post.return_value = ok_response()
+    
+    client._post_json("https://example.test", large_payload())
+    
+    call = client._session.post.call_args
+    assert call.kwargs['headers'] == {'Content-Encoding': 'gzip'}
+    assert sent_body(call) == large_payload()
+
+
+def test_small_bodies_are_sent_uncompressed(client):
+    client._session.post.return_value = ok_response()
+    
+    client._post_json("https://example.test", {'contents': []})
+    
+    call = client._session.post.call_args
+    assert 'headers' not in call.kwargs
+    assert json.loads(call.kwargs['data']) == {'contents': []}
+
+
+def test_unsupported_media_type_falls_back_to_plain_json(client):
+    rejected = FakeResponse(415, text="Unsupported Media Type")
+    client._session.post.side_effect = [rejected, ok_response()]
+    
+    response = client._post_json("https://example.test", large_payload())
+    
+    assert response.status_code == 200
+    assert rejected.closed
+    assert client._compress_requests is False
+    retry = client._session.post.call_args_list[1]
+    assert 'headers' not in retry.kwargs
+    assert json.loads(retry.kwargs['data']) == large_payload()
+    
+    # Compression stays off for later requests
+    client._session.post.side_effect = None
+    client._session.post.return_value = ok_response()
+    client._post_json("https://example.test", large_payload())
+    assert 'headers' not in client._session.post.call_args.kwargs
+
+
+def test_bad_request_naming_the_encoding_falls_back(client):
+    rejected = FakeResponse(400, text='{"error": {"message": "Unsupported Content-Encoding: gzip"}}')
+    client._session.post.side_effect = [rejected, ok_response()]
+    
+    response = client._post_json("https://example.test", large_payload())
+    
+    assert response.status_code == 200
+    assert client._session.post.call_count == 2
+    assert client._compress_requests is False
+
+
+def test_unrelated_bad_request_is_returned_without_resending(client):
+    invalid = FakeResponse(400, text='{"error": {"message": "Invalid value at generation_config.top_k"}}')
+    client._session.post.return_value = invalid
+    
+    response = client._post_json("https://example.test", large_payload())
+    
+    assert response is invalid
+    assert client._session.post.call_count == 1
+    assert client._compress_requests is True
+
+
+def test_tier_session_does_not_retry_rate_limits(client):
+    # The fixture mocks out the sessions, so inspect a freshly built client
+    fresh_client = GeminiClient()
+    
+    tier_retry = fresh_client._tier_session.get_adapter("https://").max_retries
+    standard_retry = fresh_client._session.get_adapter("https://").max_retries
+    
+    assert 429 not in tier_retry.status_forcelist
+    assert 429 in standard_retry.status_forcelist
+
+
+def test_tiered_request_goes_through_tier_session(client):
+    client._tier_session.post.return_value = ok_response("Priority letter")
+    
+    assert client._generate_via_rest("Write an offer letter", service_tier="priority") == "Priority letter"
+    
+    assert sent_body(client._tier_session.post.call_args)['serviceTier'] == "priority"
+    client._session.post.assert_not_called()
+
+
+def test_standard_request_skips_tier_session(client):
+    client._session.post.return_value = ok_response()
+    
+    client._generate_via_rest("Write an offer letter", service_tier="standard")
+    
+    assert 'serviceTier' not in sent_body(client._session.post.call_args)
+    client._tier_session.post.assert_not_called()
+
+
+def test_rate_limited_tier_retries_once_on_standard_tier(client):
+    throttled = FakeResponse(429, text='{"error": {"status": "RESOURCE_EXHAUSTED"}}')
+    client._tier_session.post.return_value = throttled
+    client._session.post.return_value = ok_response("Standard letter")
+    
+    assert client._generate_via_rest("Write an offer letter", service_tier="priority") == "Standard letter"
+    
+    assert throttled.closed
+    assert client._session.post.call_count == 1
+    assert 'serviceTier' not in sent_body(client._session.post.call_args)
+    # A quota blip is not a reason to stop requesting the tier
+    assert client._service_tier_supported is True
+
+
+def test_bad_request_naming_service_tier_disables_tiering(client):
+    client._tier_session.post.return_value = FakeResponse(
+        400, text='{"error": {"message": "Invalid JSON payload received. Unknown name \\"serviceTier\\""}}'
+    )
+    client._session.post.return_value = ok_response("Standard letter")
+    
+    assert client._generate_via_rest("Write an offer letter", service_tier="priority") == "Standard letter"
+    assert client._service_tier_supported is False
+    
+    client._generate_via_rest("Write an offer letter", service_tier="priority")
+    assert client._tier_session.post.call_count == 1
+    assert 'serviceTier' not in sent_body(client._session.post.call_args)
+
+
+def test_unrelated_bad_request_on_tier_raises_without_retry(client):
+    client._tier_session.post.return_value = FakeResponse(
+        400, text='{"error": {"message": "Invalid value at generation_config.top_k"}}'
+    )
+    
+    with pytest.raises(Exception, match="Gemini API returned 400"):
+        client._generate_via_rest("Write an offer letter", service_tier="priority")
+    
+    client._session.post.assert_not_called()
+    assert client._service_tier_supported is True
+
+
+def test_clear_offer_cache_drops_cached_letters(client, tmp_path):
+    client.offer_cache = OfferLetterCache(db_path=str(tmp_path / "offers.sqlite3"))
+    client.offer_cache.set("key-1", "Letter on old policy")
+    
+    client.clear_offer_cache()
+    
+    assert client.offer_cache.get("key-1") is None
+
+
+def test_clear_offer_cache_without_cache_is_a_no_op(client):
+    client.offer_cache = None
+    
+    client.clear_offer_cache()
@@ -0,0 +1,121 @@
+import subprocess
+import sys
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import pytest
+
+from src.document_processor import pdf_parser
+from src.document_processor.pdf_parser import PDFParser, PROCESS_POOL_MIN_FILES
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+
+def fake_parse_pdf(self, file_path):
+    if "broken" in str(file_path):
+        raise ValueError("not a PDF")
+    return f"parsed {Path(file_path).name}"
+
+
+class InlineExecutor:
+    """Stands in for ProcessPoolExecutor, running submissions in this process"""
+    
+    instances = []
+    
+    def __init__(self, max_workers=None, mp_context=None):
+        self.max_workers = max_workers
+        self.mp_context = mp_context
+        InlineExecutor.instances.append(self)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+    
+    def submit(self, fn, *args):
+        from concurrent.futures import Future
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class FailingExecutor(InlineExecutor):
+    def submit(self, fn, *args):
+        raise BrokenProcessPool("worker died during startup")
+
+
+@pytest.fixture(autouse=True)
+def fake_parsing(monkeypatch):
+    monkeypatch.setattr(PDFParser, "parse_pdf", fake_parse_pdf)
+    InlineExecutor.instances = []
+
+
+def pdf_paths(count, broken_index=None):
+    return [
+        f"{'broken' if index == broken_index else 'policy'}_{index}.pdf"
+        for index in range(count)
+    ]
+
+
+def test_small_batches_are_parsed_without_worker_processes(monkeypatch):
+    monkeypatch.setattr(pdf_parser.os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(pdf_parser, "ProcessPoolExecutor", InlineExecutor)
+    
+    documents = PDFParser().parse_multiple_pdfs(pdf_paths(3))
+    
+    assert documents == ["parsed policy_0.pdf", "parsed policy_1.pdf", "parsed policy_2.pdf"]
+    assert InlineExecutor.instances == []
+
+
+def test_single_cpu_parses_large_batches_serially(monkeypatch):
+    monkeypatch.setattr(pdf_parser.os, "cpu_count", lambda: 1)
+    monkeypatch.setattr(pdf_parser, "ProcessPoolExecutor", InlineExecutor)
+    
+    documents = PDFParser().parse_multiple_pdfs(pdf_paths(PROCESS_POOL_MIN_FILES))
+    
+    assert len(documents) == PROCESS_POOL_MIN_FILES
+    assert InlineExecutor.instances == []
+
+
+def test_large_batches_use_spawned_workers_and_keep_order(monkeypatch):
+    monkeypatch.setattr(pdf_parser.os, "cpu_count", lambda: 4)
+    monkeypatch.setattr(pdf_parser, "ProcessPoolExecutor", InlineExecutor)
+    paths = pdf_paths(PROCESS_POOL_MIN_FILES, broken_index=2)
+    
+    outcomes = PDFParser().parse_multiple_pdfs(paths, with_errors=True)
+    
+    [executor] = InlineExecutor.instances
+    assert executor.max_workers == 4
+    assert executor.mp_context.get_start_method() == "spawn"
+    assert [doc for doc, _ in outcomes] == [
+        None if "broken" in path else f"parsed {path}" for path in paths
+    ]
+    assert outcomes[2][1] == "Error processing broken_2.pdf: not a PDF"
+
+
+def test_broken_pool_falls_back_to_serial_parsing(monkeypatch):
+    monkeypatch.setattr(pdf_parser.os, "cpu_count", lambda: 4)
+    monkeypatch.setattr(pdf_parser, "ProcessPoolExecutor", FailingExecutor)
+    
+    documents = PDFParser().parse_multiple_pdfs(pdf_paths(PROCESS_POOL_MIN_FILES, broken_index=0))
+    
+    assert documents == [f"parsed policy_{index}.pdf" for index in range(1, PROCESS_POOL_MIN_FILES)]
+
+
+def test_worker_import_does_not_load_the_model_stack():
+    # A spawned worker imports the parser module from scratch; it must not pay for
+    # torch, chromadb and sentence-transformers through the src package
+    script = (
+        "import sys, src.document_processor.pdf_parser; "
+        "print(sorted({'torch', 'chromadb', 'sentence_transformers', 'pandas'} & set(sys.modules)))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,95 @@
+import logging
+import threading
+from types import SimpleNamespace
+from unittest import mock
+
+from src.agent.rag_engine import RAGEngine
+from src.document_processor import PDFParser
+from src.document_processor import pdf_parser
+
+
+def make_engine(**attributes):
+    """RAGEngine without its model stack; tests attach only the collaborators they use"""
+    engine = RAGEngine.__new__(RAGEngine)
+    engine.logger = logging.getLogger("test_rag_engine")
+    for name, value in attributes.items():
+        setattr(engine, name, value)
+    return engine
+
+
+class FakeChunker:
+    def chunk_document(self, parsed_doc):
+        return [f"{parsed_doc.metadata.filename} chunk"]
+
+
+def fake_parsed_doc(self, file_path):
+    name = file_path.rsplit("/", 1)[-1]
+    if "Broken" in name:
+        raise ValueError("not a PDF")
+    metadata = SimpleNamespace(filename=name, document_type="hr_policy", page_count=1)
+    return SimpleNamespace(metadata=metadata)
+
+
+def test_bundled_documents_are_parsed_without_worker_processes(tmp_path, monkeypatch):
+    def no_process_pool(*args, **kwargs):
+        raise AssertionError("small batches should not start worker processes")
+    
+    monkeypatch.setattr(pdf_parser, "ProcessPoolExecutor", no_process_pool)
+    monkeypatch.setattr(pdf_parser.os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(PDFParser, "parse_pdf", fake_parsed_doc)
+    
+    names = ["HR Leave Policy.pdf", "Broken Policy.pdf", "HR Offer Letter.pdf"]
+    for name in names:
+        (tmp_path / name).write_bytes(b"%PDF")
+    paths = [str(tmp_path / name) for name in names[:2]] + [str(tmp_path / "Missing.pdf"), str(tmp_path / names[2])]
+    
+    engine = make_engine(pdf_parser=PDFParser(), text_chunker=FakeChunker())
+    results = list(engine._parse_and_chunk_documents(paths))
+    
+    assert [chunks for chunks, _, _ in results] == [
+        ["HR Leave Policy.pdf chunk"], [], [], ["HR Offer Letter.pdf chunk"]
+    ]
+    assert results[1][2] == "Error processing Broken Policy.pdf: not a PDF"
+    assert results[2][2].startswith("Document not found:")
+
+
+def test_reset_vector_store_clears_cached_offer_letters():
+    engine = make_engine(vector_store=mock.Mock(), gemini_client=mock.Mock())
+    engine._invalidate_template_context = mock.Mock()
+    
+    engine.reset_vector_store()
+    
+    engine.vector_store.clear_collection.assert_called_once_with()
+    engine.gemini_client.invalidate_context_caches.assert_called_once_with()
+    engine.gemini_client.clear_offer_cache.assert_called_once_with()
+
+
+def test_system_status_runs_its_checks_inline():
+    calling_threads = []
+    
+    def on_calling_thread(result):
+        def check(*args):
+            calling_threads.append(threading.current_thread())
+            return result
+        return check
+    
+    vector_store = mock.Mock()
+    vector_store.get_collection_stats.side_effect = on_calling_thread({'total_documents': 12})
+    vector_store.embedding_manager.get_model_info.return_value = {'model_name': 'fake-model'}
+    engine = make_engine(
+        vector_store=vector_store,
+        employee_manager=mock.Mock(**{'count_employees.return_value': 3}),
+        gemini_client=mock.Mock(**{'test_connection.side_effect': on_calling_thread(True)})
+    )
+    
+    status = engine.get_system_status()
+    
+    assert calling_threads == [threading.current_thread()] * 2
+    
+    assert status == {
+        'vector_store': {'total_documents': 12},
+        'employee_count': 3,
+        'gemini_connected': True,
+        'embedding_model': {'model_name': 'fake-model'},
+        'system_ready': True
+    }
@@ -0,0 +1,104 @@
+import sqlite3
+
+import pytest
+
+from src.agent import response_cache
+from src.agent.gemini_client import GenerationConfig
+from src.agent.response_cache import OfferLetterCache
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+    
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(response_cache, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return OfferLetterCache(db_path=str(tmp_path / "offers.sqlite3"), ttl_seconds=100)
+
+
+def employee_context(name="Martha Bennett", band="L3"):
+    return {
+        "employee": {"name": name, "salary_band": band, "base_salary": 1500000},
+        "salary_band_info": {"level": "Senior", "leave_days": 24}
+    }
+
+
+def test_exact_hit_and_miss(cache):
+    key = OfferLetterCache.make_key(employee_context(), "policies", "template", GenerationConfig())
+    
+    assert cache.get(key) is None
+    cache.set(key, "Dear Martha")
+    assert cache.get(key) == "Dear Martha"
+
+
+def test_exact_key_covers_every_input():
+    config = GenerationConfig()
+    base = OfferLetterCache.make_key(employee_context(), "policies", "template", config)
+    
+    assert base == OfferLetterCache.make_key(employee_context(), "policies", "template", GenerationConfig())
+    assert base != OfferLetterCache.make_key(employee_context(band="L4"), "policies", "template", config)
+    assert base != OfferLetterCache.make_key(employee_context(), "other policies", "template", config)
+    assert base != OfferLetterCache.make_key(employee_context(), "policies", "other template", config)
+    assert base != OfferLetterCache.make_key(employee_context(), "policies", "template", GenerationConfig(temperature=0.1))
+
+
+def test_exact_entry_expires_after_ttl(cache, clock):
+    key = OfferLetterCache.make_key(employee_context(), "policies", "template", GenerationConfig())
+    cache.set(key, "Dear Martha")
+    
+    clock.now += 100
+    assert cache.get(key) == "Dear Martha"
+    
+    clock.now += 1
+    assert cache.get(key) is None
+    # Expired entries are deleted, so they stay gone even if the TTL is lifted
+    cache.ttl_seconds = 0
+    assert cache.get(key) is None
+
+
+def test_policy_edit_past_the_embedding_window_misses(cache):
+    # Policies sharing their opening text used to embed to cosine ~1.0 and be
+    # served the letter built on the old wording
+    opening = "Leave policy for L3 employees. " * 100
+    old_policy = opening + "Carry forward is capped at 10 days."
+    new_policy = opening + "Carry forward is capped at 5 days."
+    config = GenerationConfig()
+    cache.set(OfferLetterCache.make_key(employee_context(), old_policy, "template", config), "Letter on old policy")
+    
+    assert cache.get(OfferLetterCache.make_key(employee_context(), new_policy, "template", config)) is None
+
+
+def test_delete_and_clear(cache):
+    for key in ("key-1", "key-2"):
+        cache.set(key, f"Letter {key}")
+    
+    cache.delete("key-1")
+    assert cache.get("key-1") is None
+    assert cache.get("key-2") == "Letter key-2"
+    
+    cache.clear()
+    assert cache.get("key-2") is None
+
+
+def test_setup_drops_the_legacy_semantic_table(tmp_path, clock):
+    db_path = tmp_path / "offers.sqlite3"
+    with sqlite3.connect(str(db_path)) as conn:
+        conn.execute("CREATE TABLE offer_letter_semantic_cache (key TEXT PRIMARY KEY, letter TEXT)")
+        conn.execute("INSERT INTO offer_letter_semantic_cache VALUES ('key-1', 'Stale letter')")
+    
+    OfferLetterCache(db_path=str(db_path))
+    
+    with sqlite3.connect(str(db_path)) as conn:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert tables == {"offer_letter_cache"}
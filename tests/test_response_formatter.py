@@ -0,0 +1,50 @@
+import pytest
+
+from src.utils import response_formatter
+from src.utils.response_formatter import ResponseFormatter
+
+LEAVE_MATRIX = """Leave Entitlement Matrix
+Band Total Leave Earned Sick Casual WFH Eligibility WFO Minimum
+L3 24 14 6 4 Partial 3/week
+L5 Unlimited (with approval) Full Flex 0-2/week"""
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    for helper in (response_formatter._is_leave_matrix, response_formatter._parse_leave_entitlement_matrix,
+                   response_formatter._is_travel_matrix, response_formatter._parse_travel_entitlement_matrix):
+        helper.cache_clear()
+
+
+def test_leave_matrix_row_is_parsed_for_the_band():
+    formatter = ResponseFormatter()
+    
+    assert formatter._is_leave_matrix(LEAVE_MATRIX)
+    breakdown = formatter._parse_leave_entitlement_matrix(LEAVE_MATRIX, "L3")
+    
+    assert "**Total Annual Leave:** 24 days" in breakdown
+    assert "**Casual Leave (CL):** 4 days" in breakdown
+    assert "**WFH Eligibility:** Partial (Hybrid work)" in breakdown
+    assert "**WFO Minimum:** 3/week" in breakdown
+
+
+def test_unlimited_leave_band_is_recognised():
+    breakdown = ResponseFormatter()._parse_leave_entitlement_matrix(LEAVE_MATRIX, "L5")
+    
+    assert "**Total Annual Leave:** Unlimited (with approval)" in breakdown
+    assert "**WFO Minimum:** 0-2/week (optional)" in breakdown
+
+
+def test_parsed_matrices_are_shared_across_formatters():
+    ResponseFormatter()._parse_leave_entitlement_matrix(LEAVE_MATRIX, "L3")
+    ResponseFormatter()._parse_leave_entitlement_matrix(LEAVE_MATRIX, "L3")
+    
+    info = response_formatter._parse_leave_entitlement_matrix.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_non_matrix_content_is_not_detected():
+    formatter = ResponseFormatter()
+    
+    assert not formatter._is_leave_matrix("Employees may work from home on Fridays.")
+    assert not formatter._is_travel_matrix("Employees may work from home on Fridays.")
@@ -0,0 +1,83 @@
+import pytest
+
+from src.agent.gemini_client import EmployeeView
+from src.agent.schemas import EmployeeContext, validate_employee_context
+
+
+def employee_context(**overrides):
+    employee = {
+        "name": "Martha Bennett",
+        "position": "Software Engineer",
+        "department": "Engineering",
+        "team": "Platform",
+        "salary_band": "L3",
+        "base_salary": 1500000,
+        "performance_bonus": 150000,
+        "retention_bonus": 50000,
+        "total_ctc": 1700000,
+        "joining_date": "2025-01-15",
+        "employee_id": "EMP001"
+    }
+    employee.update(overrides)
+    return {"employee": employee, "salary_band_info": {"level": "Senior", "leave_days": 24}}
+
+
+def test_valid_context_is_parsed():
+    context = validate_employee_context(employee_context())
+    
+    assert isinstance(context, EmployeeContext)
+    assert context.employee.name == "Martha Bennett"
+    assert context.employee.base_salary == 1500000.0
+    assert context.salary_band_info.leave_days == 24
+
+
+def test_extra_fields_are_ignored_and_band_info_is_optional():
+    context = employee_context(manager="Someone")
+    del context["salary_band_info"]
+    
+    parsed = validate_employee_context(context)
+    
+    assert parsed.salary_band_info.level is None
+    assert not hasattr(parsed.employee, "manager")
+
+
+@pytest.mark.parametrize("context", [
+    {},
+    {"employee": {"name": "Martha Bennett"}},
+    employee_context(base_salary="not a number"),
+    employee_context(name=None),
+])
+def test_invalid_context_raises_value_error(context):
+    with pytest.raises(ValueError, match="Invalid employee context"):
+        validate_employee_context(context)
+
+
+def test_missing_field_is_named_in_the_error():
+    context = employee_context()
+    del context["employee"]["joining_date"]
+    
+    with pytest.raises(ValueError, match="joining_date"):
+        validate_employee_context(context)
+
+
+def test_context_without_band_info_builds_a_prompt_view():
+    context = employee_context()
+    del context["salary_band_info"]
+    validate_employee_context(context)
+    
+    view = EmployeeView.from_context(context)
+    
+    assert view.level == "Standard"
+    assert view.leave_info == "Policy information not available"
+    assert view.travel_info == "Policy information not available"
+
+
+def test_explicit_none_level_renders_the_default():
+    context = employee_context()
+    context["salary_band_info"] = {"level": None, "leave_days": 24}
+    validate_employee_context(context)
+    
+    view = EmployeeView.from_context(context)
+    
+    assert view.level == "Standard"
+    assert view.leave_info == "24 days per year"
@@ -0,0 +1,84 @@
+import random
+import re
+
+import pytest
+
+from src.document_processor.text_chunker import IntelligentTextChunker, SECTION_PATTERNS
+
+
+def reference_sliding_window(text, chunk_size, overlap):
+    """Sliding window chunking as implemented before the offset-based rewrite"""
+    chunks = []
+    words = text.split()
+    
+    if len(words) <= chunk_size:
+        return [text]
+    
+    for i in range(0, len(words), chunk_size - overlap):
+        chunks.append(' '.join(words[i:i + chunk_size]))
+        if i + chunk_size >= len(words):
+            break
+    
+    return chunks
+
+
+def reference_split(text, patterns):
+    """Section splitting as implemented with finditer before the re.split rewrite"""
+    for pattern in patterns:
+        matches = list(pattern.finditer(text))
+        if matches:
+            sections = []
+            last_end = 0
+            for match in matches:
+                if match.start() > last_end:
+                    sections.append(text[last_end:match.start()])
+                sections.append(text[match.start():match.end()])
+                last_end = match.end()
+            if last_end < len(text):
+                sections.append(text[last_end:])
+            return [s for s in sections if s.strip()]
+    return [text]
+
+
+def random_text(rng, word_count):
+    words = ["leave", "L3", "travel", "₹5,000", "per-diem", "WFH", "a", "policy:", "1.", "EL/SL"]
+    separators = [" ", "  ", "\n", "\t", " \n ", "\n\n"]
+    parts = []
+    for _ in range(word_count):
+        parts.append(rng.choice(words))
+        parts.append(rng.choice(separators))
+    return rng.choice(["", " ", "\n"]) + "".join(parts)
+
+
+@pytest.mark.parametrize("chunk_size,overlap", [(5, 0), (5, 2), (7, 6), (50, 10), (1, 0)])
+def test_sliding_window_matches_reference(chunk_size, overlap):
+    rng = random.Random(chunk_size * 100 + overlap)
+    chunker = IntelligentTextChunker()
+    # Set directly: the constructor treats an overlap of 0 as "use the default"
+    chunker.chunk_size = chunk_size
+    chunker.overlap = overlap
+    
+    for word_count in list(range(0, 30)) + [97, 200]:
+        text = random_text(rng, word_count)
+        assert chunker._sliding_window_chunk_text(text) == reference_sliding_window(text, chunk_size, overlap)
+
+
+def test_short_text_is_returned_unchanged():
+    chunker = IntelligentTextChunker(chunk_size=10, overlap=2)
+    text = "  Leave\tpolicy \n for L3  "
+    
+    assert chunker._sliding_window_chunk_text(text) == [text]
+
+
+def test_split_by_patterns_matches_reference():
+    # Reference patterns are the section patterns without their capturing group
+    reference_patterns = [re.compile(pattern.pattern[1:-1]) for pattern in SECTION_PATTERNS]
+    chunker = IntelligentTextChunker(chunk_size=100, overlap=10)
+    
+    headings = ["\n1. LEAVE POLICY\n", "\nTRAVEL RULES:\n", "\nWORK FROM HOME\n\n", "\n2. Travel Matrix\n"]
+    bodies = ["Employees in L3 get 20 days.", "  ", "Per diem applies.\nHotel caps vary.", ""]
+    rng = random.Random(7)
+    
+    for _ in range(500):
+        text = "".join(rng.choice(headings) + rng.choice(bodies) for _ in range(rng.randint(0, 6)))
+        assert chunker._split_by_patterns(text, SECTION_PATTERNS) == reference_split(text, reference_patterns)
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from src.document_processor import TextChunk
+from src.embeddings import vector_store as vector_store_module
+from src.embeddings.vector_store import MIN_COSINE_SIMILARITY, VectorStore
+
+
+def unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+QUERY = "L3 leave entitlement"
+
+# Cosine similarity of each document to QUERY's vector [1, 0, 0]
+DOCUMENT_COSINES = {
+    "L3 employees get 24 days of leave": 0.8,
+    "Office parking is on level two": 0.03,
+}
+
+
+def vector_with_cosine(cosine):
+    return np.array([cosine, np.sqrt(1.0 - cosine ** 2), 0.0], dtype=np.float32)
+
+
+class FakeEmbeddingManager:
+    def __init__(self, *args, **kwargs):
+        pass
+    
+    def generate_query_embeddings(self, queries):
+        return np.stack([unit([1.0, 0.0, 0.0]) for _ in queries])
+    
+    def generate_embeddings(self, texts, batch_size=32):
+        return np.stack([vector_with_cosine(DOCUMENT_COSINES[text]) for text in texts])
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store_module, "EmbeddingManager", FakeEmbeddingManager)
+    store = VectorStore(collection_name="test_policies", persist_directory=str(tmp_path))
+    store.add_chunks([
+        TextChunk(
+            content=content,
+            chunk_id=f"policy_{index}",
+            source_document="policy.pdf",
+            document_type="hr_policy",
+            page_number=0,
+            chunk_index=index,
+            metadata={}
+        )
+        for index, content in enumerate(DOCUMENT_COSINES)
+    ])
+    return store
+
+
+def test_search_reports_cosine_similarity(store):
+    results = store.similarity_search(QUERY, n_results=2, min_similarity=MIN_COSINE_SIMILARITY)
+    
+    assert [result['content'] for result in results] == list(DOCUMENT_COSINES)
+    assert [result['similarity'] for result in results] == pytest.approx(list(DOCUMENT_COSINES.values()), abs=1e-5)
+
+
+def test_cosine_floor_keeps_weak_hits_the_old_score_kept(store):
+    # 1 / (1 + squared L2) scored this hit ~0.35, above the callers' 0.05 cut-off
+    results = store.similarity_search(QUERY, n_results=2, min_similarity=MIN_COSINE_SIMILARITY)
+    
+    assert "Office parking is on level two" in [result['content'] for result in results]
+    assert len(store.similarity_search(QUERY, n_results=2, min_similarity=0.05)) == 1
+
+
+def test_default_search_returns_negative_cosine_hits(store, monkeypatch):
+    # The old score was always positive, so the 0.0 defaults never dropped these
+    monkeypatch.setitem(DOCUMENT_COSINES, "Cafeteria menu for the week", -0.2)
+    store.add_chunks([
+        TextChunk(
+            content="Cafeteria menu for the week",
+            chunk_id="policy_menu",
+            source_document="policy.pdf",
+            document_type="hr_policy",
+            page_number=0,
+            chunk_index=9,
+            metadata={}
+        )
+    ])
+    
+    results = store.similarity_search(QUERY, n_results=3)
+    
+    assert results[-1]['content'] == "Cafeteria menu for the week"
+    assert results[-1]['similarity'] == pytest.approx(-0.2, abs=1e-5)
+    assert len(store.band_specific_search(QUERY, "L3", n_results=3)) == 3
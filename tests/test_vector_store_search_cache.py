@@ -0,0 +1,141 @@
+import numpy as np
+import pytest
+
+from src.document_processor import TextChunk
+from src.embeddings import vector_store as vector_store_module
+from src.embeddings.vector_store import VectorStore
+
+
+def unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+# Near-identical phrasings map to near-identical vectors; band variants of one
+# query map to the same vector, as templated queries nearly do in practice
+QUERY_VECTORS = {
+    "leave entitlement L3": unit([1.0, 0.0, 0.0, 0.0]),
+    "leave entitlements L3": unit([1.0, 0.05, 0.0, 0.0]),
+    "leave entitlement L4": unit([1.0, 0.0, 0.0, 0.0]),
+    "annual leave L3": unit([1.0, 0.5, 0.0, 0.0]),
+}
+
+DOCUMENT_VECTORS = {
+    "L3 employees get 24 days of leave": unit([1.0, 0.1, 0.0, 0.0]),
+    "L4 employees get 28 days of leave": unit([0.9, 0.2, 0.1, 0.0]),
+    "Travel per diem for L3": unit([0.0, 0.0, 1.0, 0.0]),
+}
+
+
+class FakeEmbeddingManager:
+    def __init__(self, *args, **kwargs):
+        pass
+    
+    def generate_query_embeddings(self, queries):
+        return np.stack([QUERY_VECTORS[query] for query in queries])
+    
+    def generate_embeddings(self, texts, batch_size=32):
+        return np.stack([DOCUMENT_VECTORS[text] for text in texts])
+
+
+class CountingCollection:
+    """Wraps a ChromaDB collection and counts query calls"""
+    
+    def __init__(self, collection):
+        self._collection = collection
+        self.query_count = 0
+    
+    def query(self, **kwargs):
+        self.query_count += 1
+        return self._collection.query(**kwargs)
+    
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+
+def make_chunk(content, index):
+    return TextChunk(
+        content=content,
+        chunk_id=f"policy_{index}",
+        source_document="policy.pdf",
+        document_type="hr_policy",
+        page_number=0,
+        chunk_index=index,
+        metadata={"chunking_method": "semantic"}
+    )
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store_module, "EmbeddingManager", FakeEmbeddingManager)
+    store = VectorStore(collection_name="test_policies", persist_directory=str(tmp_path))
+    store.add_chunks([make_chunk(content, index) for index, content in enumerate(DOCUMENT_VECTORS)])
+    store.collection = CountingCollection(store.collection)
+    return store
+
+
+def test_near_duplicate_query_is_served_from_cache(store):
+    first = store.similarity_search("leave entitlement L3", n_results=2)
+    second = store.similarity_search("leave entitlements L3", n_results=2)
+    
+    assert store.collection.query_count == 1
+    assert [result['content'] for result in second] == [result['content'] for result in first]
+    assert first[0]['content'] == "L3 employees get 24 days of leave"
+
+
+def test_cache_hits_return_independent_copies(store):
+    first = store.similarity_search("leave entitlement L3", n_results=2)
+    original_similarity = first[0]['similarity']
+    # Band re-ranking mutates results in place
+    first[0]['similarity'] += 0.4
+    first[0]['band_specific'] = True
+    
+    second = store.similarity_search("leave entitlement L3", n_results=2)
+    third = store.similarity_search("leave entitlement L3", n_results=2)
+    
+    assert store.collection.query_count == 1
+    assert second[0]['similarity'] == pytest.approx(original_similarity)
+    assert 'band_specific' not in second[0]
+    assert second[0] is not third[0]
+
+
+def test_different_band_is_never_served_from_cache(store):
+    store.similarity_search("leave entitlement L3", n_results=2)
+    store.similarity_search("leave entitlement L4", n_results=2)
+    
+    assert store.collection.query_count == 2
+
+
+def test_query_below_threshold_misses(store):
+    store.similarity_search("leave entitlement L3", n_results=2)
+    store.similarity_search("annual leave L3", n_results=2)
+    
+    assert float(QUERY_VECTORS["leave entitlement L3"] @ QUERY_VECTORS["annual leave L3"]) < 0.98
+    assert store.collection.query_count == 2
+
+
+def test_different_search_parameters_miss(store):
+    store.similarity_search("leave entitlement L3", n_results=2)
+    store.similarity_search("leave entitlement L3", n_results=3)
+    store.similarity_search("leave entitlement L3", n_results=2, document_types=["hr_policy"])
+    
+    assert store.collection.query_count == 3
+
+
+def test_batch_searches_only_query_misses(store):
+    store.similarity_search("leave entitlement L3", n_results=2)
+    results = store.similarity_search_batch(["leave entitlements L3", "annual leave L3"], n_results=2)
+    
+    assert store.collection.query_count == 2
+    assert len(results) == 2 and all(results)
+
+
+def test_adding_chunks_invalidates_cache(store, monkeypatch):
+    store.similarity_search("leave entitlement L3", n_results=2)
+    
+    monkeypatch.setitem(DOCUMENT_VECTORS, "Leave carry forward for L3", unit([1.0, 0.0, 0.0, 0.01]))
+    store.add_chunks([make_chunk("Leave carry forward for L3", 10)])
+    results = store.similarity_search("leave entitlement L3", n_results=2)
+    
+    assert store.collection.query_count == 2
+    assert results[0]['content'] == "Leave carry forward for L3"